@@ -3,11 +3,12 @@ Installs missing Python modules, handles venv, and restarts.
 pattern: ModuleNotFoundError: No module named '([^']+)'
 """
 
-import subprocess
 import sys
 import os
 import asyncio
 
+timeout = 300   # seconds the executor allows for an install
+
 async def apply(bot, error_details, bot_path=None):
     """
     Attempts to install the missing module using pip. If bot_path is provided, tries within its venv.
@@ -25,9 +26,16 @@ async def apply(bot, error_details, bot_path=None):
         if os.path.exists(venv_python):
             python_exe = venv_python
     
+    # Install module without blocking the event loop; the pip process dies with a cancelled apply
+    process = await asyncio.create_subprocess_exec(
+        python_exe, "-m", "pip", "install", module,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
     try:
-        # Install module
-        subprocess.check_call([python_exe, "-m", "pip", "install", module])
+        output, _ = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode == 0:
         return True, f"Installed module {module}"
-    except subprocess.CalledProcessError as e:
-        return False, f"Installation failed: {e}"
+    return False, f"Installation failed (exit {process.returncode}): {output.decode(errors='replace')[-300:]}"
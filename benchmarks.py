@@ -0,0 +1,128 @@
+"""
+Micro-benchmarks for the master bot's hot paths.
+
+Usage:
+    python benchmarks.py licenses [count] [--db]
+    python benchmarks.py matcher [lines]
+    python benchmarks.py tracebacks [count]
+"""
+import os
+import re
+import sys
+import time
+import random
+
+from solution_matcher import SolutionMatcher
+from fingerprint import fingerprint
+from traceback_assembler import TracebackAssembler
+from solution_registry import parse_solution
+
+def bench_user_licenses(count=10000, with_db=False):
+    """Codes per second for local CSPRNG generation and (optionally) the full bulk insert."""
+    # Imported here: loading database starts its pools, sinks and journals, which the other benchmarks don't need
+    import database as db
+    try:
+        start = time.perf_counter()
+        codes = {db.random_user_license() for _ in range(count)}
+        elapsed = time.perf_counter() - start
+        print(f"local generation : {count} codes in {elapsed:.3f}s -> {count / elapsed:,.0f} codes/s "
+              f"({count - len(codes)} local duplicates)")
+        if with_db:
+            start = time.perf_counter()
+            inserted = len(db.generate_user_licenses_bulk(count, "Benchmark"))
+            elapsed = time.perf_counter() - start
+            print(f"bulk insert      : {inserted} codes in {elapsed:.3f}s -> {inserted / elapsed:,.0f} codes/s")
+    finally:
+        db.shutdown()
+
+def _solution_patterns(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Solutions")):
+    """(file, pattern) pairs for every solution, parsed the way the registry does."""
+    patterns = []
+    for file in sorted(os.listdir(directory)):
+        if file.endswith(".py") and not file.startswith("__"):
+            with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
+                patterns.append((file, parse_solution(file, f.read())['pattern']))
+    return patterns
+
+def bench_matcher(count=200000):
+    """Lines per second: the old per-solution search loop vs the combined SolutionMatcher."""
+    patterns = _solution_patterns()
+    compiled = {file: re.compile(pattern, re.IGNORECASE) for file, pattern in patterns}
+    matcher = SolutionMatcher((file, pattern, 0) for file, pattern in patterns)
+    rng = random.Random(42)
+    noise = [
+        "INFO discord.gateway: Shard ID None has connected to Gateway (Session ID: {}).",
+        "  File \"/Work/bot{}/cogs/tickets.py\", line 88, in callback",
+        "WARNING discord.http: We are being rate limited. Retrying in {}s",
+        "DEBUG heartbeat ack latency {}ms",
+    ]
+    errors = [
+        "ModuleNotFoundError: No module named 'aiohttp_{}'",
+        "discord.errors.NotFound: 404 Not Found (error code: 10062): Unknown interaction {}",
+        "KeyError: 'user_{}'",
+    ]
+    lines = [
+        (rng.choice(errors) if rng.random() < 0.05 else rng.choice(noise)).format(rng.randint(1, 10 ** 6))
+        for _ in range(count)
+    ]
+
+    def old_loop(line):
+        for file, pattern in compiled.items():
+            if pattern.search(line):
+                return file
+        return None
+
+    for label, func in (("per-solution loop", old_loop), ("SolutionMatcher", lambda l: matcher.match(l)[0])):
+        start = time.perf_counter()
+        hits = sum(1 for line in lines if func(line))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<18}: {count / elapsed:>12,.0f} lines/s ({hits} matches, {len(patterns)} patterns)")
+
+def bench_tracebacks(count=5000):
+    """Per-line processing vs assembled events over a stream of discord.py tracebacks."""
+    matcher = SolutionMatcher((file, pattern, 0) for file, pattern in _solution_patterns())
+    lines = []
+    for i in range(count):
+        lines.append(f"2024-05-01 12:00:{i % 60:02d} ERROR    discord.client Ignoring exception in on_message")
+        lines.append("Traceback (most recent call last):")
+        for depth in range(6):
+            lines.append(f'  File "/Work/bot{i % 40}/cogs/module{depth}.py", line {10 + depth}, in handler{depth}')
+            lines.append(f"    await self.step{depth}(interaction)")
+        lines.append(f"discord.errors.NotFound: 404 Not Found (error code: 10062): Unknown interaction {10 ** 18 + i}")
+
+    def per_line():
+        work = 0
+        for line in lines:
+            fingerprint(line)
+            matcher.match(line.strip())
+            work += 1
+        return work
+
+    def assembled():
+        assembler = TracebackAssembler()
+        work = 0
+        for line in lines:
+            for event in assembler.feed(line):
+                fingerprint(event.match_text)
+                matcher.match(event.match_text)
+                work += 1
+        return work + len(assembler.flush())
+
+    for label, func in (("per line", per_line), ("assembled", assembled)):
+        start = time.perf_counter()
+        work = func()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<10}: {work:>8} match/count passes, {elapsed:.3f}s ({len(lines) / elapsed:,.0f} lines/s)")
+
+BENCHMARKS = {
+    'licenses': lambda args: bench_user_licenses(int(args[0]) if args else 10000, '--db' in sys.argv),
+    'matcher': lambda args: bench_matcher(int(args[0]) if args else 200000),
+    'tracebacks': lambda args: bench_tracebacks(int(args[0]) if args else 5000),
+}
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args or args[0] not in BENCHMARKS:
+        print(__doc__)
+        sys.exit(1)
+    BENCHMARKS[args[0]](args[1:])
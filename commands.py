@@ -2,6 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+import asyncio
 from datetime import datetime
 
 from config import EMOJIS, COLORS, FOOTER_TEXT
@@ -51,7 +52,7 @@ class MasterCommands(commands.Cog):
                 return
 
         try:
-            license_code = db.register_bot_license(bot_name, owner_id_int)
+            license_code = await db.aio.register_bot_license(bot_name, owner_id_int)
         except Exception as e:
             logger.error(f"Failed to register bot license: {e}")
             embed = discord.Embed(
@@ -98,7 +99,7 @@ class MasterCommands(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            db.deactivate_bot_license(license_code)
+            await db.aio.deactivate_bot_license(license_code)
             embed = discord.Embed(
                 title=f"{EMOJIS['success']} License Deactivated",
                 description=f"License `{license_code}` has been deactivated.",
@@ -136,7 +137,11 @@ class MasterCommands(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         # Verify that the license exists (optional, but good practice)
-        if not db.verify_bot_license(license_code):  # verify just checks existence, doesn't update timestamp
+        try:
+            is_valid = await db.aio.verify_bot_license(license_code)
+        except asyncio.TimeoutError:
+            is_valid = False
+        if not is_valid:
             embed = discord.Embed(
                 title=f"{EMOJIS['error']} Invalid License",
                 description=f"License `{license_code}` is not active or does not exist.",
@@ -170,5 +175,46 @@ class MasterCommands(commands.Cog):
         embed.set_footer(text=FOOTER_TEXT)
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+    # ---------- /solutionstats – Hit counts, success rates and match order of solutions ----------
+    @app_commands.command(name="solutionstats", description="Show solution hit counts, success rates and order (admin only)")
+    async def solutionstats(self, interaction: discord.Interaction):
+        if not self.is_admin(interaction):
+            embed = discord.Embed(
+                title=f"{EMOJIS['error']} Permission Denied",
+                description="This command is for administrators only.",
+                color=COLORS['error']
+            ).set_footer(text=FOOTER_TEXT)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        monitor = self.bot.get_cog('ErrorMonitor')
+        if not monitor:
+            embed = discord.Embed(
+                title=f"{EMOJIS['error']} Error Monitor Unavailable",
+                description="The ErrorMonitor cog is not loaded.",
+                color=COLORS['error']
+            ).set_footer(text=FOOTER_TEXT)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title=f"{EMOJIS['log']} Solution Statistics",
+            description="**Match order:** " + " → ".join(f"`{name}`" for name in monitor.registry.matcher.order),
+            color=COLORS['info'],
+            timestamp=datetime.utcnow()
+        )
+        for row in monitor.get_solution_stats()[:20]:
+            rate = f"{row['success_rate']:.0%}" if row['success_rate'] is not None else "–"
+            match_us = f"{row['avg_match_us']:.1f}µs" if row['avg_match_us'] is not None else "–"
+            apply_s = f"{row['avg_apply_s']:.2f}s" if row['avg_apply_s'] is not None else "–"
+            embed.add_field(
+                name=row['solution'],
+                value=(f"Hits: `{row['hits']}` · Runs: `{row['runs']}` · Success: `{rate}`\n"
+                       f"Priority: `{row['priority']}` · Match: `{match_us}` · Apply: `{apply_s}`"),
+                inline=False
+            )
+        embed.set_footer(text=FOOTER_TEXT)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(MasterCommands(bot))
\ No newline at end of file
@@ -9,7 +9,32 @@ DATABASE = {
     'server': 'localhost',               
     'database': 'DISCORDBOT',
     'uid': 'Databaseuser',                   
-    'pwd': 'DATABASEPW'                  
+    'pwd': 'DATABASEPW'
+}
+DATABASE_POOL = {
+    'max_size': 10,            # hard cap on open connections
+    'acquire_timeout': 10,     # seconds to wait for a free connection
+    'idle_timeout': 300,       # close connections idle longer than this
+    'ping_after': 30           # ping connections idle longer than this before reuse
+}
+LICENSE_CACHE = {
+    'refresh_interval': 30,    # seconds between incremental bot_licenses refreshes
+    'filter_error_rate': 0.001,  # share of made-up license codes the Bloom filter lets through
+    'filter_headroom': 2.0,    # filter capacity as a multiple of the license count at rebuild
+    'miss_refresh_interval': 2.0   # an unknown code forces a refresh at most this often
+}
+HEARTBEAT = {
+    'max_staleness': 30        # seconds a verification may wait before last_verified is written
+}
+LICENSE_POOL = {
+    'target_size': 200,        # reserved codes kept per license type
+    'low_water': 50,           # refill as soon as a type drops to this many
+    'check_interval': 300      # seconds between routine top-ups
+}
+DATABASE_ASYNC = {
+    'workers': DATABASE_POOL['max_size'],   # executor threads for db.aio calls
+    'max_pending': 100,        # awaiting callers beyond this wait before queueing
+    'timeout': 15              # default per-call timeout in seconds
 }
 # ---------- Discord ----------
 BOT_TOKEN = os.getenv('MASTER_BOT_TOKEN', 'YOUR_BOT_TOKEN')
@@ -18,6 +43,26 @@ TEMPLATE_FOLDER_NAME = "HandshakeBot_Template"
 TEMPLATE_PATH = os.path.join(BOTS_BASE_PATH, TEMPLATE_FOLDER_NAME)
 MASTER_BOT_PATH = os.path.dirname(os.path.abspath(__file__))
 
+# ---------- Audit write-behind (error/solution/patch/duplication logs) ----------
+AUDIT_SINK = {
+    'batch_size': 500,         # flush as soon as this many rows are pending
+    'flush_interval': 2.0,     # ...or after this many seconds
+    'capacity': 10000,         # max pending rows per table
+    'overflow': 'block',       # 'block', 'drop_oldest' or 'drop_newest' once capacity is hit
+    'block_timeout': 1.0,      # 'block' waits this long for room before dropping the row
+    'journal_dir': os.path.join(MASTER_BOT_PATH, "journal"),   # crash journal, None disables
+    'fsync': False,            # fsync every journal append (survives power loss, costs IOPS)
+    'max_backoff': 60.0        # failed flushes retry after flush_interval, doubling up to this
+}
+
+# ---------- Bot path sync ----------
+BOT_PATH_SCAN = {
+    'workers': 8,              # threads reading bot config.py files
+    'cache_file': os.path.join(MASTER_BOT_PATH, ".bot_path_cache.json"),  # (path, mtime, size, license)
+    'debounce': 1.0,           # seconds of quiet before a burst of config.py changes is applied
+    'poll_interval': 10        # fallback polling period when inotify is unavailable
+}
+
 # ---------- Emojis & Colours ----------
 EMOJIS = {
     'success': '✅',
@@ -43,6 +88,40 @@ FOOTER_TEXT = "Master Bot – By AW (Alex Wakrod)"
 # ---------- Master Secret (for signing) ----------
 MASTER_SECRET = os.getenv('MASTER_SECRET', 'YOUR_BOT_SPECIALSIGN')
 
+# ---------- Session tokens (resume without re-verifying) ----------
+SESSION_TOKENS = {
+    'ttl': 86400,              # seconds a token issued on verification stays valid
+    'capabilities': ('resume', 'report', 'patches')
+}
+
+# ---------- Replay protection for presented license proofs ----------
+REPLAY_PROTECTION = {
+    'skew': 300,               # seconds a signed timestamp stays presentable (either side of now)
+    'max_per_second': 256      # proofs remembered per signed second; beyond that the oldest is evicted
+}
+
+# ---------- Local endpoint (co-hosted child bots) ----------
+LOCAL_ENDPOINT = {
+    'path': os.path.join(MASTER_BOT_PATH, "master.sock"),   # Unix socket, None disables
+    'mode': 0o660,             # socket file permissions – who may verify/report
+    'max_request': 65536       # bytes per JSON request line
+}
+
+# ---------- Verification batching ----------
+VERIFY_BATCH = {
+    'window': 0.005,           # resolve once no new handshake arrived for this long...
+    'max_delay': 0.025,        # ...but never hold the first one longer than this
+    'max_batch': 500           # or as soon as this many distinct licenses are waiting
+}
+
+# ---------- Invalid-license reply throttling ----------
+REPLY_THROTTLE = {
+    'base_delay': 5,           # seconds an author is ignored after their first invalid license...
+    'max_delay': 600,          # ...doubling per repeat up to this
+    'forget_after': 3600,      # strikes expire after this long without another one
+    'max_authors': 4096
+}
+
 # ---------- Auto‑created channels ----------
 VERIFY_CATEGORY = "Verification"
 VERIFY_CHANNEL = "bot-verify"
@@ -57,8 +136,45 @@ USER_LICENSE_FORMAT = "####-####-####"        # Format after prefix
 
 # ---------- Solutions Path ----------
 SOLUTION_PATH = os.path.join(BOTS_BASE_PATH, "MasterBot", "Solutions") # /media/alexwakrod/Local Disk 11/Work/MasterBot/Solutions
+SOLUTION_REGISTRY = {
+    'cache_file': os.path.join(MASTER_BOT_PATH, ".solution_index.json"),  # parsed patterns by file hash
+    'debounce': 1.0,           # seconds of quiet before edited solutions are re-indexed
+    'poll_interval': 10        # fallback polling period when inotify is unavailable
+}
 ADMIN_USER_ID = 1399234194281861201  # Replace with your Discord user ID
 MASTER_BOT_ID = 1471507680139939850
 
+# ---------- Error monitor ----------
+ERROR_MONITOR = {
+    'queue_size': 1000,        # stderr lines buffered per bot
+    'overflow': 'drop_oldest', # 'drop_oldest' or 'sample' once a bot's queue is full
+    'sample_every': 10,        # 'sample' keeps every Nth line while the queue is full
+    'max_concurrency': 8,      # error lines processed at once across all bots
+    'repeat_threshold': 3,     # unmatched repeats of one fingerprint before the admin is notified
+    'repeat_window': 300,      # ...counted over this many seconds
+    'window_buckets': 10,      # resolution of the sliding window
+    'max_fingerprints': 256,   # distinct fingerprints tracked per bot (least recent evicted)
+    'idle_flush': 0.5,         # seconds of stderr silence that complete a traceback/log record
+    'max_event_lines': 200,    # lines kept per assembled event
+    'solution_cooldown': 120,  # seconds a (bot, solution, fingerprint) fix is not re-run after finishing
+    'restart_cooldown': 60,    # seconds between automatic restarts of one bot
+    'reorder_interval': 60,    # min seconds between re-ranking solutions by success rate
+    'ingest_workers': 2        # processes reading/matching bot stderr (0 = read in the master's event loop)
+}
+RESTART_POLICY = {
+    'base_delay': 5.0,         # first repeat restart waits this long, doubling per recent restart
+    'max_delay': 300.0,        # backoff ceiling in seconds
+    'jitter': 0.2,             # ±20% randomisation so bots don't restart in lockstep
+    'loop_threshold': 5,       # this many restarts...
+    'loop_window': 600,        # ...within this many seconds is a crash loop
+    'quarantine': 1800,        # seconds a crash-looping bot is left alone
+    'max_concurrent': 2        # restarts running at once across the fleet
+}
+SOLUTION_EXECUTOR = {
+    'workers': 4,              # event-loop threads solutions run on
+    'max_concurrent': 4,       # solutions applied at once across all bots
+    'timeout': 60              # seconds before apply() is cancelled (a module's `timeout` overrides it)
+}
+
 # ---------- T-PERM (Ticket Permissions) ---------------
 TICKET_PERMISSION_CHANNEL = "t-permission" #Ticket Permissions
@@ -1,14 +1,32 @@
 import pyodbc
 import logging
 import random
+import secrets
 import string
 import os
 import re
-from config import DATABASE, USER_LICENSE_PREFIX, USER_LICENSE_FORMAT, BOTS_BASE_PATH
+import json
+import threading
+import time
+import asyncio
+import functools
+import atexit
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DATABASE, DATABASE_POOL, DATABASE_ASYNC, AUDIT_SINK, LICENSE_CACHE, HEARTBEAT, LICENSE_POOL,
+    BOT_PATH_SCAN, USER_LICENSE_PREFIX, USER_LICENSE_FORMAT, BOTS_BASE_PATH
+)
+from write_behind import WriteBehindSink, CoalescedUpdate
+from license_cache import LicenseIndex
+from license_pool import LicensePool
+import session_tokens
+import migrations
 
 logger = logging.getLogger(__name__)
 
-def get_connection():
+# ---------- Connection Pool ----------
+def _open_connection():
     try:
         conn = pyodbc.connect(
             driver=DATABASE['driver'],
@@ -23,6 +41,221 @@ def get_connection():
         logger.error(f"Database connection failed: {e}")
         raise
 
+class _PooledConnection:
+    """Proxy handed out by get_connection(); close() returns the connection to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw)
+
+class ConnectionPool:
+    """Bounded LIFO pool of pyodbc connections with idle eviction and liveness pings."""
+
+    def __init__(self, connect, max_size=10, acquire_timeout=10, idle_timeout=300, ping_after=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self._idle = []                  # [(raw_connection, last_used)] – newest last
+        self._open = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats = {
+            'hits': 0, 'misses': 0, 'timeouts': 0,
+            'waits': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+            'evicted': 0, 'reconnects': 0
+        }
+
+    def acquire(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            logger.error(f"Connection pool exhausted ({self.max_size} in use for {self.acquire_timeout}s)")
+            raise pyodbc.OperationalError('HYT00', 'Connection pool exhausted')
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['waits'] += 1
+            self._stats['wait_total'] += waited
+            self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+        try:
+            raw = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        return _PooledConnection(self, raw)
+
+    def _checkout(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                expired = self._evict_idle(now)
+                item = self._idle.pop() if self._idle else None
+            self._close_all(expired)
+            if item is None:
+                raw = self._connect()
+                with self._lock:
+                    self._open += 1
+                    self._stats['misses'] += 1
+                return raw
+            raw, last_used = item
+            if now - last_used >= self.ping_after and not self._ping(raw):
+                # Server probably restarted – every idle connection shares the same fate.
+                logger.warning("Pooled connection failed liveness check, reconnecting.")
+                with self._lock:
+                    self._stats['reconnects'] += 1
+                    stale, self._idle = self._idle, []
+                self._close_all([raw] + [conn for conn, _ in stale])
+                continue
+            with self._lock:
+                self._stats['hits'] += 1
+            return raw
+
+    def _evict_idle(self, now):
+        """Pop connections idle past idle_timeout (oldest sit at the bottom). Caller holds the lock."""
+        expired = []
+        while self._idle and now - self._idle[0][1] >= self.idle_timeout:
+            expired.append(self._idle.pop(0)[0])
+        self._stats['evicted'] += len(expired)
+        return expired
+
+    def _ping(self, raw):
+        try:
+            cursor = raw.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _close_all(self, connections):
+        for raw in connections:
+            try:
+                raw.close()
+            except pyodbc.Error:
+                pass
+        if connections:
+            with self._lock:
+                self._open -= len(connections)
+
+    def release(self, raw):
+        try:
+            # Discard uncommitted work so the next borrower starts clean
+            raw.rollback()
+        except pyodbc.Error:
+            # Broken connection (e.g. server restart) – drop it instead of pooling it
+            with self._lock:
+                self._stats['reconnects'] += 1
+            self._close_all([raw])
+        else:
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        self._close_all([conn for conn, _ in idle])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+        stats['max_size'] = self.max_size
+        stats['wait_avg'] = stats['wait_total'] / stats['waits'] if stats['waits'] else 0.0
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+_pool = ConnectionPool(_open_connection, **DATABASE_POOL)
+
+def get_connection():
+    """Borrow a pooled connection; call close() on it to give it back."""
+    return _pool.acquire()
+
+def get_pool_stats():
+    """Pool sizing counters: hits/misses, wait time, evictions and reconnects."""
+    return _pool.stats()
+
+def close_pool():
+    _pool.close()
+
+# ---------- Audit Sinks (write-behind) ----------
+# Append-only audit rows are buffered and written in batches; the event time is
+# captured at enqueue so delayed flushes don't skew the timestamp columns.
+# Rows the database rejects (truncation, constraint violations) are dead-lettered instead of retried
+_DATA_ERRORS = (pyodbc.DataError, pyodbc.IntegrityError)
+
+_sinks = {
+    'error_logs': WriteBehindSink(
+        'error_logs', ('bot_license', 'error_message'),
+        get_connection, timestamp_column='timestamp', **AUDIT_SINK, data_errors=_DATA_ERRORS),
+    'solution_logs': WriteBehindSink(
+        'solution_logs', ('bot_license', 'bot_name', 'error_type', 'solution_file', 'success', 'details'),
+        get_connection, timestamp_column='applied_at', **AUDIT_SINK, data_errors=_DATA_ERRORS),
+    'error_events': WriteBehindSink(
+        'error_events', ('bot_license', 'bot_name', 'error_text', 'matched_solution', 'fingerprint'),
+        get_connection, timestamp_column='occurred_at', **AUDIT_SINK, data_errors=_DATA_ERRORS),
+    'patch_tracking': WriteBehindSink(
+        'patch_tracking', ('bot_license', 'bot_name', 'patch_filename'),
+        get_connection, timestamp_column='downloaded_at', **AUDIT_SINK, data_errors=_DATA_ERRORS),
+    'bot_duplications': WriteBehindSink(
+        'bot_duplications', ('user_id', 'folder_name', 'bot_token', 'license_code'),
+        get_connection, timestamp_column='created_at', **AUDIT_SINK, data_errors=_DATA_ERRORS),
+    # Written straight from the event loop by RestartScheduler, so a full buffer must never block
+    'restart_history': WriteBehindSink(
+        'restart_history', ('bot_path', 'outcome', 'delay_seconds', 'reason'),
+        get_connection, timestamp_column='restarted_at', **{**AUDIT_SINK, 'overflow': 'drop_oldest'},
+        data_errors=_DATA_ERRORS),
+}
+
+def flush_audit_logs():
+    """Force every audit buffer to the database now."""
+    return sum(sink.flush() for sink in _sinks.values())
+
+def get_audit_stats():
+    return {table: sink.stats() for table, sink in _sinks.items()}
+
+# ---------- License Index ----------
+# Lookups are served from memory once init_db() has loaded the index; until then
+# (or if the load failed) the helpers below fall back to querying SQL Server.
+_licenses = LicenseIndex(get_connection, **LICENSE_CACHE)
+
+def refresh_license_index():
+    """Pull bot_licenses changes now instead of waiting for the next refresh tick."""
+    return _licenses.refresh()
+
+def refresh_license_index_for_miss() -> bool:
+    """Catch up before treating an unknown code as never issued; False if rate-limited (see LicenseIndex.refresh_for_miss)."""
+    return _licenses.refresh_for_miss()
+
+# ---------- Verification Heartbeats ----------
+# verify_bot_license only records the time; all pending last_verified values are
+# written together by one UPDATE ... JOIN at most HEARTBEAT['max_staleness'] later.
+_heartbeats = CoalescedUpdate('bot_licenses', 'license_code', 'last_verified', get_connection, **HEARTBEAT)
+
+def flush_heartbeats():
+    return _heartbeats.flush()
+
+def get_heartbeat_stats():
+    return _heartbeats.stats()
+
 def column_exists(cursor, table, column):
     """Check if a column exists in a table."""
     cursor.execute("""
@@ -31,90 +264,144 @@ def column_exists(cursor, table, column):
     """, (table, column))
     return cursor.fetchone() is not None
 
-def migrate_bot_licenses():
-    """Add bot_path column to bot_licenses if missing, preserving data."""
+# ---------- Bot Paths ----------
+_LICENSE_RE = re.compile(r'LICENSE_CODE\s*=\s*["\']([^"\']+)["\']')
+_scan_cache_lock = threading.Lock()
+
+def _load_scan_cache():
+    try:
+        with open(BOT_PATH_SCAN['cache_file'], 'r', encoding='utf-8') as f:
+            return {path: tuple(entry) for path, entry in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def _save_scan_cache(cache):
+    tmp_path = BOT_PATH_SCAN['cache_file'] + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, BOT_PATH_SCAN['cache_file'])
+    except OSError as e:
+        logger.warning(f"Could not save bot path scan cache: {e}")
+
+def scan_bot_dir(path, cached=None):
+    """(mtime_ns, size, license_code) for one bot folder, re-reading config.py only if it changed.
+
+    Returns None when the folder has no config.py.
+    """
+    try:
+        st = os.stat(os.path.join(path, "config.py"))
+    except OSError:
+        return None
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached
+    return (st.st_mtime_ns, st.st_size, extract_license_from_config(os.path.join(path, "config.py")))
+
+def scan_bot_paths():
+    """Map every bot folder under BOTS_BASE_PATH to its LICENSE_CODE.
+
+    Folders are listed with os.scandir and checked on a thread pool; configs whose
+    (mtime, size) match the persisted scan cache are not re-read.
+    """
+    with _scan_cache_lock:
+        cache = _load_scan_cache()
+        dirs = get_bot_directories(require_config=False)
+        with ThreadPoolExecutor(max_workers=BOT_PATH_SCAN['workers'], thread_name_prefix="bot-scan") as pool:
+            results = pool.map(lambda path: (path, scan_bot_dir(path, cache.get(path))), dirs)
+            fresh = {path: entry for path, entry in results if entry}
+        if fresh != cache:
+            _save_scan_cache(fresh)
+    return {path: entry[2] for path, entry in fresh.items() if entry[2]}
+
+def apply_bot_paths(paths, removed=()):
+    """Write {bot_path: license_code} into bot_licenses with one MERGE; returns rows changed.
+
+    Paths listed in ``removed`` (folders that vanished or lost their config) are cleared.
+    """
+    # One path per license (bot_path is the MERGE key's payload), deterministic on duplicates
+    by_license = {license_code: path for path, license_code in sorted(paths.items())}
+    if not by_license and not removed:
+        return 0
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        # Check if table exists
-        cursor.execute("SELECT 1 FROM sysobjects WHERE name='bot_licenses' AND xtype='U'")
-        if not cursor.fetchone():
-            # Table doesn't exist yet, will be created by init_db
-            return
-
-        # Check if bot_path column exists
-        if not column_exists(cursor, 'bot_licenses', 'bot_path'):
-            logger.info("Migrating bot_licenses table to add bot_path column...")
-            
-            # Create new table with updated schema
-            cursor.execute("""
-                CREATE TABLE bot_licenses_new (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    license_code NVARCHAR(50) UNIQUE NOT NULL,
-                    bot_name NVARCHAR(100) NOT NULL,
-                    is_active BIT DEFAULT 1,
-                    created_at DATETIME DEFAULT GETDATE(),
-                    last_verified DATETIME,
-                    owner_id BIGINT,
-                    bot_path NVARCHAR(500) NULL
-                )
-            """)
-            
-            # Copy data from old table
+        updated = 0
+        cursor.fast_executemany = True
+        if by_license:
+            cursor.execute("IF OBJECT_ID('tempdb..#bot_paths') IS NOT NULL DROP TABLE #bot_paths")
+            cursor.execute("CREATE TABLE #bot_paths (license_code NVARCHAR(50) PRIMARY KEY, bot_path NVARCHAR(500))")
+            cursor.executemany("INSERT INTO #bot_paths (license_code, bot_path) VALUES (?, ?)", list(by_license.items()))
             cursor.execute("""
-                INSERT INTO bot_licenses_new (license_code, bot_name, is_active, created_at, last_verified, owner_id)
-                SELECT license_code, bot_name, is_active, created_at, last_verified, owner_id
-                FROM bot_licenses
+                MERGE bot_licenses AS t
+                USING #bot_paths AS s ON t.license_code = s.license_code
+                WHEN MATCHED AND (t.bot_path IS NULL OR t.bot_path <> s.bot_path)
+                    THEN UPDATE SET t.bot_path = s.bot_path;
             """)
-            
-            # Drop old table
-            cursor.execute("DROP TABLE bot_licenses")
-            
-            # Rename new table
-            cursor.execute("EXEC sp_rename 'bot_licenses_new', 'bot_licenses'")
-            
-            conn.commit()
-            logger.info("Migration complete: added bot_path column.")
+            updated += cursor.rowcount
+            cursor.execute("DROP TABLE #bot_paths")
+        if removed:
+            cursor.executemany("UPDATE bot_licenses SET bot_path = NULL WHERE bot_path = ?", [(p,) for p in removed])
+        conn.commit()
     except pyodbc.Error as e:
-        logger.error(f"Migration failed: {e}")
+        logger.error(f"Failed to sync bot paths: {e}")
         conn.rollback()
-        raise
+        return 0
     finally:
         cursor.close()
         conn.close()
+    for path in removed:
+        license_code = _licenses.code_for_path(path)
+        if license_code:
+            _licenses.update(license_code, bot_path=None)
+    for license_code, path in by_license.items():
+        record = _licenses.get(license_code)
+        if record and record['bot_path'] != path:
+            _licenses.update(license_code, bot_path=path)
+    return updated
+
+def refresh_bot_configs(config_paths):
+    """Apply changed ``<bot>/config.py`` files reported by the path watcher.
+
+    Only the affected folders are re-read; None (watch events were lost) falls back
+    to a cache-assisted sync_bot_paths().
+    """
+    if config_paths is None:
+        sync_bot_paths()
+        return
+    paths, removed = {}, []
+    with _scan_cache_lock:
+        cache = _load_scan_cache()
+        for path in {os.path.dirname(p) for p in config_paths}:
+            entry = scan_bot_dir(path, cache.get(path))
+            if entry and entry[2]:
+                cache[path] = entry
+                paths[path] = entry[2]
+            else:
+                cache.pop(path, None)
+                removed.append(path)
+        _save_scan_cache(cache)
+    updated = apply_bot_paths(paths, removed)
+    logger.info(f"📁 Bot folders changed: {len(paths)} updated, {len(removed)} removed ({updated} paths written)")
 
 def sync_bot_paths():
     """Scan all bot directories and update bot_path for matching licenses."""
     logger.info("Syncing bot paths with licenses...")
-    updated = 0
-    for path in get_bot_directories():
-        config_path = os.path.join(path, "config.py")
-        license_code = extract_license_from_config(config_path)
-        if license_code:
-            # Update the license with this path
-            conn = get_connection()
-            cursor = conn.cursor()
-            try:
-                cursor.execute("UPDATE bot_licenses SET bot_path = ? WHERE license_code = ?", (path, license_code))
-                if cursor.rowcount > 0:
-                    updated += 1
-                conn.commit()
-            except pyodbc.Error as e:
-                logger.error(f"Failed to set path for {license_code}: {e}")
-            finally:
-                cursor.close()
-                conn.close()
-    logger.info(f"Synced {updated} bot paths.")
+    start = time.monotonic()
+    paths = scan_bot_paths()
+    updated = apply_bot_paths(paths)
+    logger.info(f"Synced {updated} bot paths ({len(paths)} bots scanned in {time.monotonic() - start:.2f}s).")
 
-def get_bot_directories():
+def get_bot_directories(require_config=True):
     """Helper to get list of bot directories (copied from bot_manager)."""
     dirs = []
     try:
-        for item in os.listdir(BOTS_BASE_PATH):
-            full = os.path.join(BOTS_BASE_PATH, item)
-            config_path = os.path.join(full, "config.py")
-            if os.path.isdir(full) and os.path.isfile(config_path):
-                dirs.append(full)
+        with os.scandir(BOTS_BASE_PATH) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                if require_config and not os.path.isfile(os.path.join(entry.path, "config.py")):
+                    continue
+                dirs.append(entry.path)
     except Exception as e:
         logger.error(f"Error scanning bot directories: {e}")
     return dirs
@@ -123,146 +410,25 @@ def extract_license_from_config(config_path):
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
             content = f.read()
-        match = re.search(r'LICENSE_CODE\s*=\s*["\']([^"\']+)["\']', content)
+        match = _LICENSE_RE.search(content)
         return match.group(1) if match else None
     except Exception as e:
         logger.error(f"Error reading {config_path}: {e}")
         return None
 
 def init_db():
-    """Create all master‑bot related tables if they don't exist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """Bring the schema up to date, sync bot paths and warm the in-memory caches."""
+    migrations.migrate(get_connection)
+    sync_bot_paths()
+    # Build the in-memory license index from the synced table
     try:
-        # ----- Bot Licenses (handshake bot authentication) -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='bot_licenses' AND xtype='U')
-            CREATE TABLE bot_licenses (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                license_code NVARCHAR(50) UNIQUE NOT NULL,
-                bot_name NVARCHAR(100) NOT NULL,
-                is_active BIT DEFAULT 1,
-                created_at DATETIME DEFAULT GETDATE(),
-                last_verified DATETIME,
-                owner_id BIGINT,
-                bot_path NVARCHAR(500) NULL
-            )
-        """)
-        conn.commit()
-
-        # ----- Error Logs -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='error_logs' AND xtype='U')
-            CREATE TABLE error_logs (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                bot_license NVARCHAR(50) NOT NULL,
-                error_message NVARCHAR(MAX) NOT NULL,
-                timestamp DATETIME DEFAULT GETDATE(),
-                forwarded BIT DEFAULT 0
-            )
-        """)
-        conn.commit()
-
-        # ----- Patch History -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='patches' AND xtype='U')
-            CREATE TABLE patches (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                bot_license NVARCHAR(50) NOT NULL,
-                filename NVARCHAR(255) NOT NULL,
-                applied_at DATETIME DEFAULT GETDATE()
-            )
-        """)
-        conn.commit()
-
-        # ----- User Licenses -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='user_licenses' AND xtype='U')
-            CREATE TABLE user_licenses (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                license_code NVARCHAR(50) UNIQUE NOT NULL,
-                product_name NVARCHAR(100) NOT NULL,
-                is_active BIT DEFAULT 1,
-                expiration_date DATE,
-                assigned_to BIGINT,
-                giveaway_id INT,
-                created_at DATETIME DEFAULT GETDATE()
-            )
-        """)
-        conn.commit()
-
-        # ----- Solution Logs -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='solution_logs' AND xtype='U')
-            CREATE TABLE solution_logs (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                bot_license NVARCHAR(50),
-                bot_name NVARCHAR(100),
-                error_type NVARCHAR(255),
-                solution_file NVARCHAR(255),
-                applied_at DATETIME DEFAULT GETDATE(),
-                success BIT DEFAULT 1,
-                details NVARCHAR(MAX)
-            )
-        """)
-        conn.commit()
-
-        # ----- Error Events -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='error_events' AND xtype='U')
-            CREATE TABLE error_events (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                bot_license NVARCHAR(50),
-                bot_name NVARCHAR(100),
-                error_text NVARCHAR(MAX),
-                matched_solution NVARCHAR(255),
-                notified_admin BIT DEFAULT 0,
-                occurred_at DATETIME DEFAULT GETDATE()
-            )
-        """)
-        conn.commit()
-
-        # ----- Patch Tracking -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='patch_tracking' AND xtype='U')
-            CREATE TABLE patch_tracking (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                bot_license NVARCHAR(50),
-                bot_name NVARCHAR(100),
-                patch_filename NVARCHAR(255),
-                downloaded_at DATETIME DEFAULT GETDATE(),
-                dm_sent BIT DEFAULT 0
-            )
-        """)
-        conn.commit()
-
-        # ----- Bot Duplications Log -----
-        cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='bot_duplications' AND xtype='U')
-            CREATE TABLE bot_duplications (
-                id INT IDENTITY(1,1) PRIMARY KEY,
-                user_id BIGINT NOT NULL,
-                folder_name NVARCHAR(255) NOT NULL,
-                bot_token NVARCHAR(100) NOT NULL,
-                license_code NVARCHAR(50),
-                created_at DATETIME DEFAULT GETDATE()
-            )
-        """)
-        conn.commit()
-
-        logger.info("✅ Master Bot database tables initialised.")
+        _licenses.load()
     except pyodbc.Error as e:
-        logger.error(f"Error creating master tables: {e}")
-        conn.rollback()
-        raise
-    finally:
-        cursor.close()
-        conn.close()
-
-    # After tables exist, run migration if needed (for older installs)
-    migrate_bot_licenses()
-    # Then sync paths
-    sync_bot_paths()
+        logger.error(f"License index load failed, lookups will query SQL directly: {e}")
+    # Tokens of licenses deactivated while the master was down must not resume
+    session_tokens.seed_revocations(get_inactive_bot_licenses())
+    _license_pool.start()
+    logger.info("✅ Master Bot database initialised.")
 
 # ---------- Bot License Management ----------
 def generate_bot_license() -> str:
@@ -281,9 +447,16 @@ def generate_bot_license() -> str:
         license += random.choice(chars)
     return license
 
-def generate_unique_bot_license():
-    conn = get_connection()
-    cursor = conn.cursor()
+def generate_unique_bot_license(cursor=None):
+    """A bot license code not in bot_licenses yet, checked on ``cursor`` or on a connection of its own.
+
+    Callers already holding a pooled connection must pass its cursor: taking a second
+    connection while holding one can deadlock once the pool is exhausted.
+    """
+    conn = None
+    if cursor is None:
+        conn = get_connection()
+        cursor = conn.cursor()
     try:
         while True:
             license = generate_bot_license()
@@ -291,19 +464,21 @@ def generate_unique_bot_license():
             if not cursor.fetchone():
                 return license
     finally:
-        cursor.close()
-        conn.close()
+        if conn:
+            cursor.close()
+            conn.close()
 
 def register_bot_license(bot_name: str, owner_id: int = None) -> str:
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        license_code = generate_unique_bot_license()
+        license_code = _license_pool.claim(cursor, 'bot') or generate_unique_bot_license(cursor)
         cursor.execute("""
             INSERT INTO bot_licenses (license_code, bot_name, owner_id)
             VALUES (?, ?, ?)
         """, (license_code, bot_name, owner_id))
         conn.commit()
+        _licenses.upsert(license_code, bot_name, owner_id=owner_id)
         logger.info(f"✅ Registered new bot license: {license_code} for '{bot_name}'")
         return license_code
     except pyodbc.Error as e:
@@ -314,29 +489,55 @@ def register_bot_license(bot_name: str, owner_id: int = None) -> str:
         cursor.close()
         conn.close()
 
+_IN_CHUNK = 1000     # SQL Server allows 2100 parameters per statement
+
+def license_may_exist(license_code: str) -> bool:
+    """False when the license filter proves the code was never issued (no SQL involved)."""
+    return _licenses.may_exist(license_code)
+
 def verify_bot_license(license_code: str) -> bool:
-    conn = get_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT 1 FROM bot_licenses
-            WHERE license_code = ? AND is_active = 1
-        """, (license_code,))
-        exists = cursor.fetchone() is not None
-        if exists:
-            cursor.execute("""
-                UPDATE bot_licenses
-                SET last_verified = GETDATE()
-                WHERE license_code = ?
-            """, (license_code,))
-            conn.commit()
-        return exists
-    except pyodbc.Error as e:
-        logger.error(f"Error verifying bot license {license_code}: {e}")
+        return license_code in verify_bot_licenses([license_code])
+    except pyodbc.Error:
         return False
-    finally:
-        cursor.close()
-        conn.close()
+
+def verify_bot_licenses(license_codes) -> set:
+    """The subset of ``license_codes`` that are active, from the cache or one IN (...) query per chunk.
+
+    Raises pyodbc.Error if the lookup fails, so callers can tell "invalid" from "unknown".
+    """
+    codes = [code for code in dict.fromkeys(license_codes) if _licenses.may_exist(code)]
+    if not codes:
+        return set()
+    if _licenses.loaded:
+        valid = set()
+        for code in codes:
+            record = _licenses.get(code)
+            if record and record['is_active']:
+                valid.add(code)
+    else:
+        valid = set()
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            for start in range(0, len(codes), _IN_CHUNK):
+                chunk = codes[start:start + _IN_CHUNK]
+                cursor.execute(f"""
+                    SELECT license_code FROM bot_licenses
+                    WHERE is_active = 1 AND license_code IN ({', '.join('?' for _ in chunk)})
+                """, chunk)
+                valid.update(row[0] for row in cursor.fetchall())
+        except pyodbc.Error as e:
+            logger.error(f"Error verifying {len(codes)} bot licenses: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+    now = datetime.now()
+    for code in valid:
+        _heartbeats.record(code, now)
+        _licenses.update(code, last_verified=now)
+    return valid
 
 def deactivate_bot_license(license_code: str):
     conn = get_connection()
@@ -344,6 +545,8 @@ def deactivate_bot_license(license_code: str):
     try:
         cursor.execute("UPDATE bot_licenses SET is_active = 0 WHERE license_code = ?", (license_code,))
         conn.commit()
+        _licenses.update(license_code, is_active=False)
+        session_tokens.revoke(license_code)
         logger.info(f"✅ Deactivated bot license: {license_code}")
     except pyodbc.Error as e:
         logger.error(f"Error deactivating bot license {license_code}: {e}")
@@ -353,7 +556,36 @@ def deactivate_bot_license(license_code: str):
         cursor.close()
         conn.close()
 
+def get_inactive_bot_licenses():
+    if _licenses.loaded:
+        return _licenses.inactive_codes()
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT license_code FROM bot_licenses WHERE is_active = 0")
+        return [row[0] for row in cursor.fetchall()]
+    except pyodbc.Error as e:
+        logger.error(f"Error fetching inactive bot licenses: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
+
+def is_license_deactivated(license_code: str) -> bool:
+    """True when the license index knows ``license_code`` is inactive (no SQL; False if unknown)."""
+    record = _licenses.get(license_code)
+    return bool(record and not record['is_active'])
+
+def touch_bot_license(license_code: str):
+    """Record a verification that was proven without the database (e.g. a resumed session)."""
+    now = datetime.now()
+    _heartbeats.record(license_code, now)
+    _licenses.update(license_code, last_verified=now)
+
 def get_bot_name_by_license(license_code: str):
+    if _licenses.loaded:
+        record = _licenses.get(license_code)
+        return record['bot_name'] if record else None
     conn = get_connection()
     cursor = conn.cursor()
     try:
@@ -368,6 +600,8 @@ def get_bot_name_by_license(license_code: str):
         conn.close()
 
 def get_all_active_bots():
+    if _licenses.loaded:
+        return [(r['license_code'], r['bot_name'], r['last_verified']) for r in _licenses.active()]
     conn = get_connection()
     cursor = conn.cursor()
     try:
@@ -387,6 +621,8 @@ def get_all_active_bots():
         conn.close()
 
 def get_license_by_path(bot_path: str):
+    if _licenses.loaded:
+        return _licenses.code_for_path(bot_path)
     conn = get_connection()
     cursor = conn.cursor()
     try:
@@ -406,6 +642,7 @@ def set_license_path(license_code: str, bot_path: str):
     try:
         cursor.execute("UPDATE bot_licenses SET bot_path = ? WHERE license_code = ?", (bot_path, license_code))
         conn.commit()
+        _licenses.update(license_code, bot_path=bot_path)
     except pyodbc.Error as e:
         logger.error(f"Error setting license path: {e}")
         conn.rollback()
@@ -416,41 +653,25 @@ def set_license_path(license_code: str, bot_path: str):
 
 # ---------- Error Logging ----------
 def log_bot_error(license_code: str, error_message: str):
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO error_logs (bot_license, error_message) VALUES (?, ?)", (license_code, error_message))
-        conn.commit()
+    if _sinks['error_logs'].put(license_code, error_message):
         logger.info(f"📝 Logged error from bot license: {license_code}")
-    except pyodbc.Error as e:
-        logger.error(f"Failed to log error for {license_code}: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
 
 # ---------- User Licenses (for giveaways) ----------
+_LICENSE_CHARS = string.ascii_uppercase + string.digits
+
 def generate_user_license(product_name: str = "Giveaway", assigned_to: int = None, giveaway_id: int = None) -> str:
-    chars = string.ascii_uppercase + string.digits
-    license = USER_LICENSE_PREFIX
-    for ch in USER_LICENSE_FORMAT:
-        if ch == '#':
-            license += random.choice(chars)
-        else:
-            license += ch
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        while True:
-            cursor.execute("SELECT 1 FROM user_licenses WHERE license_code = ?", (license,))
-            if not cursor.fetchone():
-                break
-            license = USER_LICENSE_PREFIX
-            for ch in USER_LICENSE_FORMAT:
-                if ch == '#':
-                    license += random.choice(chars)
-                else:
-                    license += ch
+        license = _license_pool.claim(cursor, 'user')
+        if license is None:
+            # Pool is empty – generate and check uniqueness on the spot
+            license = random_user_license()
+            while True:
+                cursor.execute("SELECT 1 FROM user_licenses WHERE license_code = ?", (license,))
+                if not cursor.fetchone():
+                    break
+                license = random_user_license()
         cursor.execute("""
             INSERT INTO user_licenses (license_code, product_name, assigned_to, giveaway_id)
             VALUES (?, ?, ?, ?)
@@ -465,90 +686,228 @@ def generate_user_license(product_name: str = "Giveaway", assigned_to: int = Non
         cursor.close()
         conn.close()
 
-def generate_multiple_user_licenses(count: int, product_name: str = "Giveaway", giveaway_id: int = None) -> list:
-    codes = []
-    for _ in range(count):
-        codes.append(generate_user_license(product_name, None, giveaway_id))
-    return codes
-
-def assign_license_to_user(license_code: str, user_id: int):
+def random_user_license() -> str:
+    """One USER_LICENSE_PREFIX + USER_LICENSE_FORMAT code drawn from a CSPRNG."""
+    return USER_LICENSE_PREFIX + ''.join(
+        secrets.choice(_LICENSE_CHARS) if ch == '#' else ch for ch in USER_LICENSE_FORMAT
+    )
+
+def generate_user_licenses_bulk(count: int, product_name: str = "Giveaway", giveaway_id: int = None,
+                                assigned_to: int = None) -> list:
+    """Insert `count` new user licenses in one transaction and return their codes.
+
+    Candidates are generated locally, bulk-loaded into a temp table and inserted with a
+    single INSERT ... SELECT that skips codes already present in user_licenses; rounds
+    repeat only for the (rare) collisions. The insert is committed before this returns,
+    so the codes are stored whether or not the caller uses the list.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE user_licenses SET assigned_to = ? WHERE license_code = ?", (user_id, license_code))
+        cursor.execute("IF OBJECT_ID('tempdb..#candidates') IS NOT NULL DROP TABLE #candidates")
+        cursor.execute("IF OBJECT_ID('tempdb..#accepted') IS NOT NULL DROP TABLE #accepted")
+        cursor.execute("CREATE TABLE #candidates (license_code NVARCHAR(50) PRIMARY KEY)")
+        cursor.execute("CREATE TABLE #accepted (license_code NVARCHAR(50))")
+        cursor.fast_executemany = True
+        seen = set()
+        remaining = count
+        while remaining > 0:
+            candidates = set()
+            while len(candidates) < remaining:
+                code = random_user_license()
+                if code not in seen:
+                    candidates.add(code)
+            seen.update(candidates)
+            cursor.execute("TRUNCATE TABLE #candidates")
+            cursor.executemany("INSERT INTO #candidates (license_code) VALUES (?)", [(c,) for c in candidates])
+            cursor.execute("""
+                INSERT INTO user_licenses (license_code, product_name, assigned_to, giveaway_id)
+                OUTPUT inserted.license_code INTO #accepted (license_code)
+                SELECT c.license_code, ?, ?, ?
+                FROM #candidates c
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM user_licenses u WITH (UPDLOCK, HOLDLOCK)
+                    WHERE u.license_code = c.license_code
+                )
+                AND NOT EXISTS (SELECT 1 FROM license_pool p WHERE p.license_code = c.license_code)
+            """, (product_name, assigned_to, giveaway_id))
+            remaining -= cursor.rowcount
         conn.commit()
-    except pyodbc.Error as e:
-        logger.error(f"Failed to assign license: {e}")
+        cursor.execute("SELECT license_code FROM #accepted")
+        codes = [row.license_code for row in cursor.fetchall()]
+        logger.info(f"✅ Generated {count} user licenses for '{product_name}'")
+        return codes
+    except Exception as e:
+        logger.error(f"Error generating user licenses: {e}")
         conn.rollback()
         raise
     finally:
         cursor.close()
+        try:
+            # Temp tables live as long as the (pooled) session, so drop them explicitly
+            conn.execute("DROP TABLE #candidates; DROP TABLE #accepted")
+            conn.commit()
+        except pyodbc.Error:
+            pass
         conn.close()
 
-# ---------- Solution Logs ----------
-def log_solution(bot_license, bot_name, error_type, solution_file, success=True, details=""):
+def generate_multiple_user_licenses(count: int, product_name: str = "Giveaway", giveaway_id: int = None) -> list:
+    return generate_user_licenses_bulk(count, product_name, giveaway_id)
+
+# ---------- License Pool ----------
+# Codes for both formats are generated and de-duplicated in the background, so
+# /registerbot and giveaways only pay for a single claim inside their own insert.
+_license_pool = LicensePool(get_connection, {
+    'bot': (generate_bot_license, 'bot_licenses'),
+    'user': (random_user_license, 'user_licenses'),
+}, **LICENSE_POOL)
+
+def get_license_pool_stats():
+    return _license_pool.stats()
+
+def assign_license_to_user(license_code: str, user_id: int):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO solution_logs (bot_license, bot_name, error_type, solution_file, success, details)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (bot_license, bot_name, error_type, solution_file, success, details))
+        cursor.execute("UPDATE user_licenses SET assigned_to = ? WHERE license_code = ?", (user_id, license_code))
         conn.commit()
     except pyodbc.Error as e:
-        logger.error(f"Failed to log solution: {e}")
+        logger.error(f"Failed to assign license: {e}")
         conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
 
-# ---------- Error Events ----------
-def log_error_event(bot_license, bot_name, error_text, matched_solution=None):
+# ---------- Solution Logs ----------
+def log_solution(bot_license, bot_name, error_type, solution_file, success=True, details=""):
+    _sinks['solution_logs'].put(bot_license, bot_name, error_type[:255] if error_type else error_type,
+                                solution_file, success, details)
+
+def get_solution_stats():
+    """[(solution_file, runs, successes)] over the whole solution log."""
+    _sinks['solution_logs'].flush()
     conn = get_connection()
     cursor = conn.cursor()
     try:
         cursor.execute("""
-            INSERT INTO error_events (bot_license, bot_name, error_text, matched_solution)
-            VALUES (?, ?, ?, ?)
-        """, (bot_license, bot_name, error_text, matched_solution))
-        conn.commit()
+            SELECT solution_file, COUNT(*), SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END)
+            FROM solution_logs
+            WHERE solution_file IS NOT NULL AND bot_license IS NOT NULL
+            GROUP BY solution_file
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
     except pyodbc.Error as e:
-        logger.error(f"Failed to log error event: {e}")
-        conn.rollback()
+        logger.error(f"Failed to load solution stats: {e}")
+        return []
     finally:
         cursor.close()
         conn.close()
 
+# ---------- Error Events ----------
+def log_error_event(bot_license, bot_name, error_text, matched_solution=None, fingerprint=None):
+    _sinks['error_events'].put(bot_license, bot_name, error_text, matched_solution, fingerprint)
+
 # ---------- Patch Tracking ----------
 def log_patch_download(bot_license, bot_name, patch_filename):
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            INSERT INTO patch_tracking (bot_license, bot_name, patch_filename)
-            VALUES (?, ?, ?)
-        """, (bot_license, bot_name, patch_filename))
-        conn.commit()
-    except pyodbc.Error as e:
-        logger.error(f"Failed to log patch download: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
+    _sinks['patch_tracking'].put(bot_license, bot_name, patch_filename)
 
 # ---------- Bot Duplications Log ----------
 def log_duplication(user_id: int, folder_name: str, bot_token: str, license_code: str = None):
+    _sinks['bot_duplications'].put(user_id, folder_name, bot_token, license_code)
+
+# ---------- Restart History ----------
+def log_restart(bot_path, outcome, delay_seconds=0.0, reason=None):
+    _sinks['restart_history'].put(bot_path, outcome, delay_seconds, reason[:255] if reason else None)
+
+def get_recent_restarts(window_seconds):
+    """{bot_path: [seconds ago, ...]} for restart attempts within the last ``window_seconds``."""
+    _sinks['restart_history'].flush()
     conn = get_connection()
     cursor = conn.cursor()
     try:
         cursor.execute("""
-            INSERT INTO bot_duplications (user_id, folder_name, bot_token, license_code)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, folder_name, bot_token, license_code))
-        conn.commit()
+            SELECT bot_path, DATEDIFF(SECOND, restarted_at, GETDATE())
+            FROM restart_history
+            WHERE restarted_at >= DATEADD(SECOND, -?, GETDATE())
+              AND outcome IN ('restarted', 'failed')
+        """, (int(window_seconds),))
+        restarts = {}
+        for bot_path, age in cursor.fetchall():
+            restarts.setdefault(bot_path, []).append(age)
+        return restarts
     except pyodbc.Error as e:
-        logger.error(f"Failed to log duplication: {e}")
-        conn.rollback()
+        logger.error(f"Failed to load restart history: {e}")
+        return {}
     finally:
         cursor.close()
         conn.close()
+
+# ---------- Async Facade ----------
+_DEFAULT_TIMEOUT = object()
+
+class AsyncDatabase:
+    """Awaitable versions of this module's helpers, e.g. ``await db.aio.verify_bot_license(code)``.
+
+    Calls run on a dedicated bounded thread pool so pyodbc never blocks the event loop.
+    Every call takes an optional ``timeout`` keyword (None disables it); on timeout or
+    cancellation a still-queued call is dropped and asyncio.TimeoutError/CancelledError
+    propagates to the caller. A call that already started keeps its ``max_pending`` slot
+    until its thread actually returns, so a slow database applies backpressure instead
+    of piling up threads and connections.
+    """
+
+    def __init__(self, workers=10, max_pending=100, timeout=15):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-aio")
+        self._pending = asyncio.Semaphore(max_pending)
+        self._wrappers = {}
+
+    async def run(self, func, *args, timeout=_DEFAULT_TIMEOUT, **kwargs):
+        if timeout is _DEFAULT_TIMEOUT:
+            timeout = self.timeout
+        await self._pending.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def _release(self, loop):
+        """Free a slot once the executor call has finished (called from its thread)."""
+        try:
+            loop.call_soon_threadsafe(self._pending.release)
+        except RuntimeError:
+            pass      # loop already closed at shutdown
+
+    def __getattr__(self, name):
+        func = globals().get(name)
+        if name.startswith('_') or not callable(func):
+            raise AttributeError(f"database has no helper named {name!r}")
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await self.run(func, *args, **kwargs)
+            self._wrappers[name] = wrapper
+        return wrapper
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+aio = AsyncDatabase(**DATABASE_ASYNC)
+
+# ---------- Shutdown ----------
+def shutdown():
+    """Drain background work and release connections; safe to call more than once."""
+    aio.shutdown()
+    for sink in _sinks.values():
+        sink.close()
+    _heartbeats.close()
+    _license_pool.stop()
+    close_pool()
+
+atexit.register(shutdown)
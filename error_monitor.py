@@ -1,51 +1,88 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import logging
 import os
+import time
 import asyncio
-import importlib.util
-import sys
-import re
 from datetime import datetime, timezone
 from collections import defaultdict
 
-from config import SOLUTION_PATH, ADMIN_USER_ID
+from config import SOLUTION_PATH, SOLUTION_REGISTRY, ADMIN_USER_ID, ERROR_MONITOR, SOLUTION_EXECUTOR, RESTART_POLICY
 import database as db
+from solution_registry import SolutionRegistry
+from solution_stats import SolutionStats
+from line_queue import LineQueue
+from fingerprint import fingerprint, WindowedCounter
+from traceback_assembler import TracebackAssembler
+from solution_executor import SolutionExecutor, SolutionTimeout
+from single_flight import SingleFlight
+from restart_scheduler import RestartScheduler
+from ingest_workers import IngestPool, pipe_reader
 
 logger = logging.getLogger(__name__)
 
 class ErrorMonitor(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.monitored_processes = {}  # {bot_path: {'task': task, 'process': process, 'name': name, 'license': license, 'stderr_queue': asyncio.Queue}}
-        self.solution_modules = {}      # {filename: {'module': module, 'pattern': re.compile(pattern)}}
-        self.error_counts = defaultdict(lambda: defaultdict(int))  # {bot_path: {error_signature: count}}
+        self.monitored_processes = {}  # {bot_path: {'task': task, 'consumer': task, 'process': process, 'name': name, 'license': license, 'queue': LineQueue}}
+        self.registry = SolutionRegistry(SOLUTION_PATH, **SOLUTION_REGISTRY)   # patterns indexed without importing
+        self.solution_stats = SolutionStats()
+        self.last_reorder = 0.0
+        self.error_counts = defaultdict(self.new_error_counter)  # {bot_path: WindowedCounter of fingerprints}
         self.solution_channel = None
+        self.processing_slots = asyncio.Semaphore(ERROR_MONITOR['max_concurrency'])
+        self.executor = SolutionExecutor(**SOLUTION_EXECUTOR)
+        self.single_flight = SingleFlight(ERROR_MONITOR['solution_cooldown'])
+        self.restarts = RestartScheduler(self.restart_bot, db.log_restart, self.notify_quarantine, **RESTART_POLICY)
+        self.ingest = None
+        if ERROR_MONITOR['ingest_workers']:
+            self.ingest = IngestPool(self.on_ingest_event, self.on_ingest_closed, ERROR_MONITOR['ingest_workers'],
+                                     ERROR_MONITOR['idle_flush'], ERROR_MONITOR['max_event_lines'])
         self.load_solutions()
-        self.monitor_errors.start()
+        if self.ingest:
+            # Workers start with the first bot handed to the pool (see start_bot)
+            self.registry.subscribe(self.ingest.update_solutions)
         self.monitored_paths = set()
 
     def load_solutions(self):
-        """Dynamically import all solution files and compile their patterns."""
-        for file in os.listdir(SOLUTION_PATH):
-            if file.endswith(".py") and not file.startswith("__"):
-                module_name = file[:-3]
-                spec = importlib.util.spec_from_file_location(module_name, os.path.join(SOLUTION_PATH, file))
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                # Extract pattern from module's docstring or attribute
-                pattern = None
-                if hasattr(module, 'pattern'):
-                    pattern = module.pattern
-                else:
-                    # Fallback: use filename without extension as keyword
-                    pattern = module_name.replace('_', ' ')
-                self.solution_modules[file] = {
-                    'module': module,
-                    'pattern': re.compile(pattern, re.IGNORECASE) if not isinstance(pattern, re.Pattern) else pattern,
-                    'name': module_name
-                }
-                logger.info(f"Loaded solution module: {file} with pattern: {pattern}")
+        """Index every solution file and watch SOLUTION_PATH for additions and edits."""
+        os.makedirs(SOLUTION_PATH, exist_ok=True)
+        count = self.registry.load()
+        logger.info(f"Indexed {count} solutions ({self.registry.stats()['cached']} from cache)")
+        self.registry.start()
+
+    async def cog_load(self):
+        """Seed restart history and solution success rates from the database."""
+        try:
+            history = await db.aio.get_recent_restarts(RESTART_POLICY['loop_window'])
+            for bot_path, ages in history.items():
+                self.restarts.seed(bot_path, ages)
+            self.solution_stats.seed(await db.aio.get_solution_stats())
+            self.reorder_solutions(force=True)
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ Timed out loading restart history / solution stats")
+
+    def reorder_solutions(self, force=False):
+        """Re-rank equally specific, equal-priority solutions by measured success, at most every reorder_interval seconds."""
+        now = time.monotonic()
+        if not force and now - self.last_reorder < ERROR_MONITOR['reorder_interval']:
+            return
+        self.last_reorder = now
+        if self.registry.reorder(self.solution_stats.scores()):
+            logger.info(f"🔀 Solution order: {', '.join(self.registry.matcher.order)}")
+
+    def get_solution_stats(self):
+        """Per-solution hits, runs, success rate, score and latencies, plus explicit priority."""
+        rows = self.solution_stats.snapshot()
+        for row in rows:
+            entry = self.registry.entries.get(row['solution'])
+            row['priority'] = entry['priority'] if entry else None
+        return rows
+
+    @staticmethod
+    def new_error_counter():
+        return WindowedCounter(ERROR_MONITOR['repeat_window'], ERROR_MONITOR['window_buckets'],
+                               ERROR_MONITOR['max_fingerprints'])
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -55,11 +92,40 @@ class ErrorMonitor(commands.Cog):
                 self.solution_channel = channel
                 break
 
-    def register_bot(self, bot_path, process, name, license_code):
-        queue = asyncio.Queue()
-        task = asyncio.create_task(self.monitor_bot_output(bot_path, process, name, license_code, queue))
+    async def start_bot(self, bot_path, name, license_code, *args, **kwargs):
+        """Start a bot with ``asyncio.create_subprocess_exec(*args, **kwargs)`` and monitor its stderr.
+
+        stderr goes to a pipe this cog creates, so its read end can be handed to an
+        ingestion worker.
+        """
+        read_fd, write_fd = os.pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(*args, stderr=write_fd, **kwargs)
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self.register_bot(bot_path, process, name, license_code, stderr_fd=read_fd)
+        return process
+
+    def register_bot(self, bot_path, process, name, license_code, stderr_fd=None):
+        """Monitor a started bot; ``stderr_fd`` is the read end of its stderr pipe (see start_bot).
+
+        Without ``stderr_fd`` the process must have been started with ``stderr=PIPE`` and
+        is read in the event loop.
+        """
+        queue = LineQueue(ERROR_MONITOR['queue_size'], ERROR_MONITOR['overflow'], ERROR_MONITOR['sample_every'])
+        if stderr_fd is not None and self.ingest:
+            # A worker process reads and matches this bot's stderr; events arrive via on_ingest_event
+            self.ingest.add(bot_path, stderr_fd)
+            task = None
+        else:
+            task = asyncio.create_task(self.monitor_bot_output(bot_path, process, name, license_code, queue, stderr_fd))
+        consumer = asyncio.create_task(self.consume_errors(bot_path, name, license_code, queue))
         self.monitored_processes[bot_path] = {
             'task': task,
+            'consumer': consumer,
             'process': process,
             'name': name,
             'license': license_code,
@@ -69,86 +135,172 @@ class ErrorMonitor(commands.Cog):
 
     def unregister_bot(self, bot_path):
         if bot_path in self.monitored_processes:
-            self.monitored_processes[bot_path]['task'].cancel()
+            if self.monitored_processes[bot_path]['task']:
+                self.monitored_processes[bot_path]['task'].cancel()
+            elif self.ingest:
+                self.ingest.remove(bot_path)
+            self.monitored_processes[bot_path]['consumer'].cancel()
+            self.executor.cancel(bot_path)
             del self.monitored_processes[bot_path]
             self.monitored_paths.discard(bot_path)
             self.error_counts.pop(bot_path, None)
 
-    async def monitor_bot_output(self, bot_path, process, name, license_code, queue):
-        """Read stderr line by line and put into queue for processing."""
+    async def monitor_bot_output(self, bot_path, process, name, license_code, queue, stderr_fd=None):
+        """Read stderr, assemble tracebacks and log records into events and queue them for processing."""
+        assembler = TracebackAssembler(ERROR_MONITOR['idle_flush'], ERROR_MONITOR['max_event_lines'])
+        stderr, transport = (process.stderr, None) if stderr_fd is None else await pipe_reader(stderr_fd)
+
+        def enqueue(events):
+            for event in events:
+                self.enqueue_event(name, queue, event)
+
+        try:
+            while True:
+                try:
+                    # While a block is open, a quiet stream means it is complete
+                    timeout = assembler.idle_timeout if assembler.pending else None
+                    line = await asyncio.wait_for(stderr.readline(), timeout)
+                except asyncio.TimeoutError:
+                    enqueue(assembler.flush())
+                    continue
+                if not line:
+                    break
+                line = line.decode(errors='replace').rstrip('\r\n')
+                if line:
+                    logger.debug(f"[{name}] {line}")
+                enqueue(assembler.feed(line))
+            enqueue(assembler.flush())
+        finally:
+            if transport:
+                transport.close()
+            queue.close()
+
+    def enqueue_event(self, name, queue, event, analysis=None):
+        if not queue.put_nowait((event, analysis)) and queue.stats()['dropped'] % 100 == 1:
+            logger.warning(f"⚠️ [{name}] error queue full, dropping events ({queue.stats()['dropped']} so far)")
+
+    def on_ingest_event(self, bot_path, event, signature, solution, match_ns):
+        """An event fingerprinted and matched by an ingestion worker."""
+        info = self.monitored_processes.get(bot_path)
+        if info:
+            self.enqueue_event(info['name'], info['queue'], event, (signature, solution, match_ns))
+
+    def on_ingest_closed(self, bot_path):
+        info = self.monitored_processes.get(bot_path)
+        if info:
+            info['queue'].close()
+
+    async def consume_errors(self, bot_path, name, license_code, queue):
+        """Process this bot's events as they arrive; the semaphore bounds work across the fleet."""
         while True:
-            line = await process.stderr.readline()
-            if not line:
+            item = await queue.get()
+            if item is None:
                 break
-            line = line.decode().strip()
-            if line:
-                logger.debug(f"[{name}] {line}")
-                await queue.put(line)
-
-    @tasks.loop(seconds=5)
-    async def monitor_errors(self):
-        """Process error lines from all bots."""
-        for bot_path, info in list(self.monitored_processes.items()):
-            queue = info['queue']
-            name = info['name']
-            license_code = info['license']
             try:
-                while not queue.empty():
-                    line = await queue.get()
-                    await self.process_error(bot_path, name, license_code, line)
+                async with self.processing_slots:
+                    await self.process_error(bot_path, name, license_code, *item)
             except Exception as e:
                 logger.error(f"Error processing queue for {name}: {e}")
 
-    async def process_error(self, bot_path, bot_name, license_code, error_line):
-        """Check error line, apply solutions, count occurrences, notify admin."""
-        # Update error count for this error (simplified: use error line as key)
-        self.error_counts[bot_path][error_line] += 1
-        count = self.error_counts[bot_path][error_line]
-
-        # Check if any solution pattern matches
-        matched_solution = None
-        for file, data in self.solution_modules.items():
-            if data['pattern'].search(error_line):
-                matched_solution = file
-                break
+    def get_ingest_stats(self):
+        return self.ingest.stats() if self.ingest else None
+
+    def get_queue_stats(self):
+        """{bot_path: {'depth', 'received', 'dropped', 'processed', 'max_depth'}} for every monitored bot."""
+        return {bot_path: info['queue'].stats() for bot_path, info in self.monitored_processes.items()}
+
+    def get_suppression_stats(self):
+        """{bot_path: {'runs', 'joined', 'suppressed'}} for solution runs and restarts."""
+        return self.single_flight.stats()
+
+    def get_restart_stats(self):
+        return self.restarts.stats()
+
+    async def process_error(self, bot_path, bot_name, license_code, event, analysis=None):
+        """Check an assembled error event, apply solutions, count occurrences, notify admin.
+
+        ``analysis`` is ``(fingerprint, solution, match_ns)`` when an ingestion worker already did the matching.
+        """
+        error_line = event.summary
+        if analysis:
+            signature, matched_solution, match_ns = analysis
+            if matched_solution not in self.registry.entries:
+                matched_solution = None        # removed since the worker matched it
+        else:
+            # Count repeats by fingerprint so ids, addresses and timestamps don't split one error
+            signature = fingerprint(event.match_text)
+            # Highest-priority solution matching the record header or exception line (frames are skipped)
+            started = time.perf_counter_ns()
+            matched_solution, _ = self.registry.matcher.match(event.match_text)
+            match_ns = time.perf_counter_ns() - started
+        count = self.error_counts[bot_path].add(signature)
 
         if matched_solution:
-            # Apply solution
-            module = data['module']
-            try:
-                # Pass bot_path to solution if needed
-                if hasattr(module, 'apply'):
-                    success, message = await module.apply(self.bot, error_line, bot_path)
-                else:
-                    success, message = False, "Solution module has no apply function"
-
-                db.log_solution(license_code, bot_name, error_line, matched_solution, success, message)
-                if self.solution_channel:
-                    embed = discord.Embed(
-                        title="🛠️ Solution Applied",
-                        description=f"**Bot:** {bot_name}\n**License:** `{license_code}`\n**Error:** {error_line[:200]}...\n**Solution:** {matched_solution}\n**Result:** {'✅ Success' if success else '❌ Failed'}",
-                        color=0x00ff00 if success else 0xff0000,
-                        timestamp=datetime.now(timezone.utc)
-                    )
-                    embed.set_footer(text=message)
-                    await self.solution_channel.send(embed=embed)
-
-                # If solution succeeded and involved module install, we should restart the bot
-                if success and matched_solution == 'module_not_found.py':
-                    # Restart the bot
-                    await self.restart_bot(bot_path)
-                    # Reset error count after restart
-                    self.error_counts[bot_path].clear()
-            except Exception as e:
-                logger.error(f"Failed to apply solution {matched_solution}: {e}")
-                db.log_solution(license_code, bot_name, error_line, matched_solution, False, str(e))
+            self.solution_stats.record_match(matched_solution, match_ns)
+            # Apply in the background so a slow fix never holds up this bot's queue or the fleet;
+            # repeats of the same error join the running fix or are suppressed during its cooldown.
+            # Keyed on what the pattern captured when it captures anything (the missing module, so
+            # 'requests' and 'aiohttp' each get installed), else on the fingerprint
+            arguments = self.registry.matcher.arguments(matched_solution, event.match_text)
+            self.single_flight.run(
+                (bot_path, matched_solution, arguments or signature),
+                lambda: self.apply_solution(bot_path, bot_name, license_code, event, matched_solution))
         else:
-            # No match – if error occurs 3 times in a row, notify admin
-            if count >= 3:
-                db.log_error_event(license_code, bot_name, error_line)
-                await self.notify_admin(bot_name, license_code, error_line, bot_path)
+            # No match – if the error repeats within the window, notify admin
+            if count >= ERROR_MONITOR['repeat_threshold']:
+                try:
+                    await db.aio.log_error_event(license_code, bot_name, event.text, fingerprint=signature)
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏱️ Timed out logging error event for {bot_name}")
+                await self.notify_admin(bot_name, license_code, error_line, bot_path, event.text)
                 # Reset count to avoid spam
-                self.error_counts[bot_path][error_line] = 0
+                self.error_counts[bot_path].reset(signature)
+
+    async def apply_solution(self, bot_path, bot_name, license_code, event, matched_solution):
+        """Run a matched solution on the executor, then log and announce the result."""
+        error_line = event.summary
+        recorded = False
+        try:
+            # Imported on first use; a file edited since is re-imported
+            module = await asyncio.to_thread(self.registry.module, matched_solution)
+            # Pass bot_path to solution if needed
+            started = time.monotonic()
+            if hasattr(module, 'apply'):
+                try:
+                    success, message = await self.executor.run(matched_solution, module, self.bot, event.text, bot_path)
+                except SolutionTimeout as e:
+                    success, message = False, str(e)
+            else:
+                success, message = False, "Solution module has no apply function"
+            self.solution_stats.record_result(matched_solution, success, time.monotonic() - started)
+            recorded = True
+            self.reorder_solutions()
+
+            await db.aio.log_solution(license_code, bot_name, error_line, matched_solution, success, message)
+            if self.solution_channel:
+                embed = discord.Embed(
+                    title="🛠️ Solution Applied",
+                    description=f"**Bot:** {bot_name}\n**License:** `{license_code}`\n**Error:** {error_line[:200]}...\n**Solution:** {matched_solution}\n**Result:** {'✅ Success' if success else '❌ Failed'}",
+                    color=0x00ff00 if success else 0xff0000,
+                    timestamp=datetime.now(timezone.utc)
+                )
+                embed.set_footer(text=message)
+                await self.solution_channel.send(embed=embed)
+
+            # If solution succeeded and involved module install, we should restart the bot
+            if success and matched_solution == 'module_not_found.py':
+                # Restart the bot once, however many fixes ask for it at the same time
+                restart = self.single_flight.run(
+                    (bot_path, 'restart', None), lambda: self.restarts.schedule(bot_path, matched_solution),
+                    cooldown=ERROR_MONITOR['restart_cooldown'])
+                if restart is not None and await asyncio.shield(restart) == 'restarted':
+                    # Reset error count after restart
+                    self.error_counts[bot_path].reset()
+        except Exception as e:
+            logger.error(f"Failed to apply solution {matched_solution}: {e}")
+            if not recorded:
+                self.solution_stats.record_result(matched_solution, False)
+            await db.aio.log_solution(license_code, bot_name, error_line, matched_solution, False, str(e))
 
     async def restart_bot(self, bot_path):
         """Restart a bot by stopping and starting it via bot_manager."""
@@ -169,7 +321,27 @@ class ErrorMonitor(commands.Cog):
             logger.error(f"Error restarting bot: {e}")
             return False
 
-    async def notify_admin(self, bot_name, license_code, error_line, bot_path):
+    async def notify_quarantine(self, bot_path, restarts):
+        """DM the admin that a crash-looping bot will not be restarted automatically for a while."""
+        admin = self.bot.get_user(ADMIN_USER_ID)
+        if not admin:
+            try:
+                admin = await self.bot.fetch_user(ADMIN_USER_ID)
+            except:
+                return
+        embed = discord.Embed(
+            title="🚫 Bot Quarantined",
+            description=f"**Path:** {bot_path}\n{restarts} restarts in {RESTART_POLICY['loop_window'] // 60} minutes – "
+                        f"automatic restarts paused for {RESTART_POLICY['quarantine'] // 60} minutes.",
+            color=0xe74c3c,
+            timestamp=datetime.now(timezone.utc)
+        )
+        try:
+            await admin.send(embed=embed)
+        except:
+            pass
+
+    async def notify_admin(self, bot_name, license_code, error_line, bot_path, details=None):
         """DM the admin with error details."""
         admin = self.bot.get_user(ADMIN_USER_ID)
         if not admin:
@@ -184,13 +356,23 @@ class ErrorMonitor(commands.Cog):
             timestamp=datetime.now(timezone.utc)
         )
         embed.add_field(name="Path", value=bot_path, inline=False)
+        if details and details != error_line:
+            embed.add_field(name="Traceback", value=f"```{details[-1000:]}```", inline=False)
         try:
             await admin.send(embed=embed)
         except:
             pass
 
     def cog_unload(self):
-        self.monitor_errors.cancel()
+        self.registry.stop()
+        if self.ingest:
+            self.ingest.stop()
+        for info in self.monitored_processes.values():
+            if info['task']:
+                info['task'].cancel()
+            info['consumer'].cancel()
+        self.single_flight.cancel()
+        self.executor.shutdown()
 
 async def setup(bot):
     await bot.add_cog(ErrorMonitor(bot))
\ No newline at end of file
@@ -0,0 +1,81 @@
+import re
+import time
+import hashlib
+from collections import OrderedDict
+
+# Order matters: quoted values and paths first so the numbers inside them don't leak through
+_NORMALISERS = [
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'<str>'"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}[\\/]?"), "<path>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<hex>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d{17,20}\b"), "<id>"),                                  # Discord snowflakes
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<time>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalise(line):
+    """Error line with volatile parts (ids, addresses, paths, quoted values, numbers) replaced by placeholders."""
+    for regex, placeholder in _NORMALISERS:
+        line = regex.sub(placeholder, line)
+    return line.strip()
+
+def fingerprint(line):
+    """Stable 16-hex-digit signature of ``line``; repeats of one error share it."""
+    return hashlib.blake2b(normalise(line).encode('utf-8', 'replace'), digest_size=8).hexdigest()
+
+class WindowedCounter:
+    """Fixed-memory occurrence counts per key over the last ``window`` seconds.
+
+    Each key owns a ring of ``buckets`` counters, each covering window/buckets seconds,
+    so a count is exact to one bucket and old hits age out on their own. At most
+    ``max_keys`` keys are tracked; the least recently seen one is evicted to make room.
+    """
+
+    def __init__(self, window=300.0, buckets=10, max_keys=256, clock=time.monotonic):
+        self.window = window
+        self.buckets = buckets
+        self.span = window / buckets
+        self.max_keys = max_keys
+        self._clock = clock
+        self._keys = OrderedDict()    # {key: [last_slot, counts]}
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _advance(self, entry, slot):
+        last, counts = entry
+        for s in range(last + 1, min(slot, last + self.buckets) + 1):
+            counts[s % self.buckets] = 0
+        entry[0] = max(last, slot)
+
+    def add(self, key, amount=1):
+        """Count one occurrence of ``key``; returns its total within the window."""
+        slot = int(self._clock() // self.span)
+        entry = self._keys.get(key)
+        if entry is None:
+            if len(self._keys) >= self.max_keys:
+                self._keys.popitem(last=False)
+                self.evicted += 1
+            entry = self._keys[key] = [slot, [0] * self.buckets]
+        else:
+            self._keys.move_to_end(key)
+            self._advance(entry, slot)
+        entry[1][slot % self.buckets] += amount
+        return sum(entry[1])
+
+    def count(self, key):
+        entry = self._keys.get(key)
+        if entry is None:
+            return 0
+        self._advance(entry, int(self._clock() // self.span))
+        return sum(entry[1])
+
+    def reset(self, key=None):
+        """Forget ``key`` (or every key)."""
+        if key is None:
+            self._keys.clear()
+        else:
+            self._keys.pop(key, None)
@@ -0,0 +1,38 @@
+import hmac
+import hashlib
+from datetime import datetime, timezone
+
+from config import MASTER_SECRET, REPLAY_PROTECTION
+from replay_cache import ReplayCache
+
+_replays = ReplayCache(**REPLAY_PROTECTION)
+
+def sign_license(license_code, timestamp=None):
+    """``(timestamp, signature)`` proving the master vouched for ``license_code`` at ``timestamp``.
+
+    The signature is HMAC-SHA256 over ``license:timestamp`` with MASTER_SECRET – the
+    same proof whether it reaches the child as a Discord embed or over the local socket.
+    """
+    if timestamp is None:
+        timestamp = str(int(datetime.now(timezone.utc).timestamp()))
+    signature = hmac.new(
+        MASTER_SECRET.encode(),
+        f"{license_code}:{timestamp}".encode(),
+        hashlib.sha256
+    ).hexdigest()
+    return timestamp, signature
+
+def verify_proof(license_code, timestamp, signature):
+    """Check a ``(license, timestamp, signature)`` proof a bot presents back to the master.
+
+    Returns 'ok', 'forged', 'stale' (timestamp outside the skew window) or 'replay'
+    (already presented). Only correctly signed proofs reach the replay cache, so
+    forgeries can't crowd out real entries. No database involved.
+    """
+    _, expected = sign_license(license_code, str(timestamp))
+    if not isinstance(signature, str) or not hmac.compare_digest(expected, signature.lower()):
+        return 'forged'
+    return _replays.check(timestamp, expected[:32])
+
+def replay_stats():
+    return _replays.stats()
@@ -0,0 +1,329 @@
+"""
+Out-of-process stderr ingestion for monitored bots.
+
+Each worker process owns the stderr pipes of a shard of bots (picked by a stable hash
+of the bot path) and does all per-line work there: reading, decoding, traceback
+assembly, fingerprinting and solution matching. Only finished events travel back to
+the master, as ``(bot_path, ErrorEvent, fingerprint, solution, match_ns)`` over a
+socket in length-prefixed pickle frames, so a chatty bot costs the gateway loop one small message per error instead of
+one wake-up per line.
+
+Workers are fresh interpreters running this file (``subprocess`` fork+exec), never a
+fork of the multi-threaded master and never a re-import of main.py, so they start with
+no inherited locks and none of database.py's import-time sinks and journals. This
+module must stay free of import-time side effects for the same reason.
+"""
+import os
+import sys
+import time
+import zlib
+import pickle
+import socket
+import struct
+import asyncio
+import logging
+import selectors
+import threading
+import subprocess
+from multiprocessing import reduction
+from multiprocessing.connection import Connection
+
+from fingerprint import fingerprint
+from solution_matcher import SolutionMatcher
+from traceback_assembler import TracebackAssembler, ErrorEvent
+
+logger = logging.getLogger(__name__)
+
+async def pipe_reader(fd):
+    """``(StreamReader, transport)`` over a raw pipe fd (the read end of a bot's stderr), for in-process monitoring.
+
+    Closing the transport closes ``fd``.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                os.fdopen(fd, 'rb', buffering=0))
+    return reader, transport
+
+# ---------- Result framing ----------
+_HEADER = struct.Struct('!I')
+
+def _frame(message):
+    payload = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload)) + payload
+
+def _unframe(buffer):
+    """Pop every complete message off the front of ``buffer`` (a bytearray); a partial one stays."""
+    messages = []
+    while len(buffer) >= _HEADER.size:
+        end = _HEADER.size + _HEADER.unpack_from(buffer)[0]
+        if len(buffer) < end:
+            break
+        messages.append(pickle.loads(buffer[_HEADER.size:end]))
+        del buffer[:end]
+    return messages
+
+# ---------- Worker process ----------
+class _Stream:
+    __slots__ = ('bot_path', 'fd', 'assembler', 'partial', 'last', 'open_block')
+
+    def __init__(self, bot_path, fd, idle_flush, max_lines):
+        self.bot_path = bot_path
+        self.fd = fd
+        self.assembler = TracebackAssembler(idle_flush, max_lines)
+        self.partial = b''
+        self.last = time.monotonic()
+        self.open_block = False
+
+def _worker_main(commands, results, idle_flush, max_lines):
+    selector = selectors.DefaultSelector()
+    selector.register(commands, selectors.EVENT_READ, None)
+    streams = {}          # {bot_path: _Stream}
+    matcher = SolutionMatcher(())
+
+    def emit(stream, events):
+        for event in events:
+            signature = fingerprint(event.match_text)
+            started = time.perf_counter_ns()
+            solution, _ = matcher.match(event.match_text)
+            results.sendall(_frame(('event', stream.bot_path, event, signature, solution,
+                                    time.perf_counter_ns() - started)))
+        # Tell the master when a block opens or closes, so a crash mid-block is reported rather than lost
+        if stream.assembler.pending != stream.open_block:
+            stream.open_block = stream.assembler.pending
+            results.sendall(_frame(('partial', stream.bot_path, stream.open_block)))
+
+    def feed(stream, data):
+        lines = (stream.partial + data).split(b'\n')
+        stream.partial = lines.pop()
+        for raw in lines:
+            emit(stream, stream.assembler.feed(raw.decode(errors='replace').rstrip('\r')))
+        stream.last = time.monotonic()
+
+    def close(stream):
+        if stream.partial:
+            emit(stream, stream.assembler.feed(stream.partial.decode(errors='replace').rstrip('\r')))
+        emit(stream, stream.assembler.flush())
+        selector.unregister(stream.fd)
+        os.close(stream.fd)
+        streams.pop(stream.bot_path, None)
+
+    while True:
+        pending = [s for s in streams.values() if s.assembler.pending]
+        timeout = idle_flush if pending else None
+        for key, _ in selector.select(timeout):
+            if key.data is None:
+                try:
+                    message = commands.recv()
+                except (EOFError, OSError):
+                    return
+                op = message[0]
+                if op == 'add':
+                    bot_path = message[1]
+                    fd = reduction.recv_handle(commands)
+                    os.set_blocking(fd, False)
+                    stream = streams[bot_path] = _Stream(bot_path, fd, idle_flush, max_lines)
+                    selector.register(fd, selectors.EVENT_READ, stream)
+                elif op == 'remove':
+                    stream = streams.get(message[1])
+                    if stream:
+                        close(stream)
+                elif op == 'solutions':
+                    matcher = SolutionMatcher(message[1], message[2])
+                elif op == 'stop':
+                    return
+                continue
+            stream = key.data
+            try:
+                data = os.read(stream.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            if data:
+                feed(stream, data)
+            else:
+                close(stream)
+                results.sendall(_frame(('closed', stream.bot_path)))
+        now = time.monotonic()
+        for stream in pending:
+            if stream.bot_path in streams and now - stream.last >= idle_flush:
+                emit(stream, stream.assembler.flush())
+
+# ---------- Master side ----------
+class IngestPool:
+    """Shards bot stderr pipes across ``workers`` processes and relays their events.
+
+    ``on_event(bot_path, event, fingerprint, solution, match_ns)`` and
+    ``on_closed(bot_path)`` run on the event loop; the workers are spawned on the first
+    add(), so a monitor whose bots are all read in-process never starts any. The master keeps
+    its own copy of every pipe so a crashed worker is replaced and its bots re-attached;
+    a death is noticed as end-of-file on the worker's result socket. Bots that had a
+    traceback half-assembled at that moment get a synthetic event saying so.
+    """
+
+    def __init__(self, on_event, on_closed, workers=2, idle_flush=0.5, max_event_lines=200):
+        self.on_event = on_event
+        self.on_closed = on_closed
+        self.workers = workers
+        self.idle_flush = idle_flush
+        self.max_event_lines = max_event_lines
+        self._loop = None
+        self._procs = [None] * workers        # [(process, commands, results)]
+        self._buffers = [bytearray() for _ in range(workers)]   # unread result bytes per worker
+        self._bots = {}                        # {bot_path: fd}
+        self._open_blocks = set()              # bots whose worker holds an unfinished event
+        self._solutions = ((), {})
+        self._send_lock = threading.Lock()
+        self._stats = {'events': 0, 'restarts': 0, 'lost_blocks': 0}
+
+    def start(self, loop):
+        self._loop = loop
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"🧵 Started {self.workers} log ingestion workers")
+
+    def _spawn(self, index):
+        commands, child_commands = socket.socketpair()
+        results, child_results = socket.socketpair()
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child_commands.fileno()), str(child_results.fileno()),
+             str(self.idle_flush), str(self.max_event_lines)],
+            pass_fds=(child_commands.fileno(), child_results.fileno()))
+        child_commands.close()
+        child_results.close()
+        commands = Connection(commands.detach())
+        results.setblocking(False)
+        self._buffers[index].clear()
+        self._procs[index] = (process, commands, results)
+        self._loop.add_reader(results.fileno(), self._drain, index)
+        with self._send_lock:
+            commands.send(('solutions', *self._solutions))
+
+    def _shard(self, bot_path):
+        return zlib.crc32(bot_path.encode()) % self.workers
+
+    def _send(self, index, message, fd=None):
+        process, commands, _ = self._procs[index]
+        with self._send_lock:
+            commands.send(message)
+            if fd is not None:
+                reduction.send_handle(commands, fd, process.pid)
+
+    def add(self, bot_path, fd):
+        """Hand the read end of a bot's stderr pipe to its worker; the pool owns ``fd`` from now on.
+
+        Must be called on the event loop; the first call starts the workers.
+        """
+        if self._loop is None:
+            self.start(asyncio.get_running_loop())
+        self._bots[bot_path] = fd
+        self._send(self._shard(bot_path), ('add', bot_path), fd)
+
+    def remove(self, bot_path):
+        fd = self._bots.pop(bot_path, None)
+        self._open_blocks.discard(bot_path)
+        if fd is None:
+            return
+        try:
+            self._send(self._shard(bot_path), ('remove', bot_path))
+        except (OSError, ValueError):
+            pass
+        os.close(fd)
+
+    def update_solutions(self, entries, scores):
+        """Push a new solution set to every worker (safe to call from any thread)."""
+        self._solutions = (tuple(entries), dict(scores))
+        for index, proc in enumerate(self._procs):
+            if proc:
+                try:
+                    self._send(index, ('solutions', *self._solutions))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Could not update solutions in ingest worker {index}: {e}")
+
+    def _drain(self, index):
+        # Non-blocking: take what the socket holds now and handle only the complete frames
+        _, _, results = self._procs[index]
+        try:
+            data = results.recv(256 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._restart(index)
+            return
+        buffer = self._buffers[index]
+        buffer += data
+        for message in _unframe(buffer):
+            if message[0] == 'event':
+                self._stats['events'] += 1
+                self.on_event(*message[1:])
+            elif message[0] == 'partial':
+                if message[2]:
+                    self._open_blocks.add(message[1])
+                else:
+                    self._open_blocks.discard(message[1])
+            elif message[0] == 'closed':
+                self._open_blocks.discard(message[1])
+                fd = self._bots.pop(message[1], None)
+                if fd is not None:
+                    os.close(fd)
+                self.on_closed(message[1])
+
+    def _restart(self, index):
+        process, commands, results = self._procs[index]
+        self._loop.remove_reader(results.fileno())
+        results.close()
+        commands.close()
+        exit_code = process.poll()
+        if exit_code is None:
+            # Not reaped yet (or hung with its socket closed): make sure it is gone and reap it off the loop
+            process.kill()
+            self._loop.run_in_executor(None, process.wait)
+            exit_code = 'unknown'
+        logger.error(f"❌ Ingest worker {index} died (exit {exit_code}), restarting")
+        self._stats['restarts'] += 1
+        self._spawn(index)
+        for bot_path, fd in list(self._bots.items()):
+            if self._shard(bot_path) != index:
+                continue
+            if bot_path in self._open_blocks:
+                # The half-read traceback died with the worker; record that it existed
+                self._open_blocks.discard(bot_path)
+                self._stats['lost_blocks'] += 1
+                event = ErrorEvent([f"IngestWorkerCrash: log ingestion worker {index} died (exit "
+                                    f"{exit_code}) while assembling an error; its lines were lost"])
+                self.on_event(bot_path, event, fingerprint(event.match_text), None, 0)
+            self._send(index, ('add', bot_path), fd)
+
+    def stop(self):
+        for index, proc in enumerate(self._procs):
+            if not proc:
+                continue
+            process, commands, results = proc
+            try:
+                self._loop.remove_reader(results.fileno())
+                self._send(index, ('stop',))
+            except (OSError, ValueError):
+                pass
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+            commands.close()
+            results.close()
+            self._procs[index] = None
+        for fd in self._bots.values():
+            os.close(fd)
+        self._bots.clear()
+
+    def stats(self):
+        shards = [0] * self.workers
+        for bot_path in self._bots:
+            shards[self._shard(bot_path)] += 1
+        return {**self._stats, 'bots_per_worker': shards,
+                'alive': [bool(p and p[0].poll() is None) for p in self._procs]}
+
+if __name__ == '__main__':
+    _commands_fd, _results_fd, _idle_flush, _max_lines = sys.argv[1:5]
+    _worker_main(Connection(int(_commands_fd)), socket.socket(fileno=int(_results_fd)), float(_idle_flush),
+                 int(_max_lines))
@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+
+from license_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "license_code, bot_name, is_active, last_verified, owner_id, bot_path, row_version"
+
+class LicenseIndex:
+    """In-memory replica of bot_licenses, keyed by license code and by bot_path.
+
+    load() reads the whole table once; afterwards a background thread pulls only rows
+    whose ``row_version`` is newer than the highest one seen. Writers apply their change
+    with upsert()/update() right after committing, so lookups never wait for a refresh.
+    Lookups are plain dict reads and never touch the network. A Bloom filter over every
+    known code (active or not) lets may_exist() turn away made-up codes cheaply; it is
+    rebuilt on full loads and whenever the table outgrows it. Codes issued by another
+    process only reach the filter with a refresh, so refresh_for_miss() lets a caller
+    catch up before treating a negative as final.
+    """
+
+    def __init__(self, connect, refresh_interval=30, filter_error_rate=0.001, filter_headroom=2.0,
+                 miss_refresh_interval=2.0):
+        self._connect = connect
+        self.refresh_interval = refresh_interval
+        self.miss_refresh_interval = miss_refresh_interval
+        self.filter_error_rate = filter_error_rate
+        self.filter_headroom = filter_headroom
+        self.filter = None    # BloomFilter over every license_code, once loaded
+        self._by_code = {}    # {license_code: record}
+        self._by_path = {}    # {bot_path: license_code}
+        self._marker = None   # highest row_version applied
+        self._refreshed_at = float('-inf')    # monotonic start of the last successful load/refresh
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+
+    # ----- Lookups -----
+    def get(self, license_code):
+        return self._by_code.get(license_code)
+
+    def may_exist(self, license_code):
+        """False only if ``license_code`` is certainly not in bot_licenses."""
+        bloom = self.filter
+        return bloom is None or license_code in bloom
+
+    def code_for_path(self, bot_path):
+        return self._by_path.get(bot_path)
+
+    def active(self):
+        records = [r for r in list(self._by_code.values()) if r['is_active']]
+        return sorted(records, key=lambda r: r['bot_name'])
+
+    def inactive_codes(self):
+        return [r['license_code'] for r in list(self._by_code.values()) if not r['is_active']]
+
+    # ----- Writes -----
+    def _rebuild_filter(self):
+        """Caller holds the lock."""
+        self.filter = BloomFilter.from_items(self._by_code, self.filter_error_rate, self.filter_headroom)
+
+    def _remember(self, codes):
+        """Add new codes to the filter, rebuilding it once it's past capacity. Caller holds the lock."""
+        if self.filter is None:
+            return
+        for code in codes:
+            self.filter.add(code)
+        if self.filter.saturated:
+            self._rebuild_filter()
+
+    def _apply(self, record, by_code=None, by_path=None):
+        """Replace one record and keep the path index consistent. Caller holds the lock."""
+        by_code = self._by_code if by_code is None else by_code
+        by_path = self._by_path if by_path is None else by_path
+        old = by_code.get(record['license_code'])
+        if old and old['bot_path'] and by_path.get(old['bot_path']) == old['license_code']:
+            del by_path[old['bot_path']]
+        by_code[record['license_code']] = record
+        if record['bot_path']:
+            by_path[record['bot_path']] = record['license_code']
+
+    def upsert(self, license_code, bot_name, is_active=True, last_verified=None, owner_id=None, bot_path=None):
+        with self._lock:
+            is_new = license_code not in self._by_code
+            self._apply({
+                'license_code': license_code, 'bot_name': bot_name, 'is_active': bool(is_active),
+                'last_verified': last_verified, 'owner_id': owner_id, 'bot_path': bot_path
+            })
+            if is_new:
+                self._remember((license_code,))
+
+    def update(self, license_code, **fields):
+        """Patch fields of a cached record; unknown codes are left for the next refresh."""
+        with self._lock:
+            record = self._by_code.get(license_code)
+            if record is None:
+                return False
+            self._apply({**record, **fields})
+            return True
+
+    # ----- Loading -----
+    def _fetch(self, since=None):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            if since is None:
+                cursor.execute(f"SELECT {_COLUMNS} FROM bot_licenses")
+            else:
+                cursor.execute(f"SELECT {_COLUMNS} FROM bot_licenses WHERE row_version > ?", (since,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _ingest(self, rows, reset=False):
+        with self._lock:
+            # A full reload builds fresh dicts and swaps them in, so readers never see a half-empty index
+            by_code, by_path = ({}, {}) if reset else (self._by_code, self._by_path)
+            new_codes = [row.license_code for row in rows if row.license_code not in by_code]
+            for row in rows:
+                self._apply({
+                    'license_code': row.license_code, 'bot_name': row.bot_name,
+                    'is_active': bool(row.is_active), 'last_verified': row.last_verified,
+                    'owner_id': row.owner_id, 'bot_path': row.bot_path
+                }, by_code, by_path)
+                if self._marker is None or row.row_version > self._marker:
+                    self._marker = row.row_version
+            self._by_code, self._by_path = by_code, by_path
+            if reset or self.filter is None:
+                self._rebuild_filter()
+            else:
+                self._remember(new_codes)
+        return len(rows)
+
+    def load(self):
+        """Full load; starts the incremental refresher on first success."""
+        with self._refresh_lock:
+            started = time.monotonic()
+            self._marker = None
+            count = self._ingest(self._fetch(), reset=True)
+            self._refreshed_at = started
+        self.loaded = True
+        logger.info(f"✅ License index loaded ({count} licenses)")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="license-index", daemon=True)
+            self._thread.start()
+        return count
+
+    def refresh(self):
+        """Pull rows changed since the last marker; returns how many were applied."""
+        with self._refresh_lock:
+            if self._marker is None:
+                return self.load()
+            started = time.monotonic()
+            count = self._ingest(self._fetch(self._marker))
+            self._refreshed_at = started
+            return count
+
+    def refresh_for_miss(self):
+        """Refresh for a code the index doesn't know; True if the index now reflects the table as of this call.
+
+        Concurrent callers share one refresh, and at most one runs per
+        ``miss_refresh_interval`` seconds so a flood of made-up codes can't become a
+        flood of queries; callers turned away by that limit get False.
+        """
+        asked = time.monotonic()
+        with self._refresh_lock:
+            if self._refreshed_at >= asked:
+                return True
+            if asked - self._refreshed_at < self.miss_refresh_interval:
+                return False
+            self.refresh()
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                changed = self.refresh()
+                if changed:
+                    logger.debug(f"License index refreshed {changed} rows")
+            except Exception as e:
+                # Keep serving the last good snapshot until the database is back
+                logger.warning(f"License index refresh failed: {e}")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,52 @@
+import math
+import hashlib
+
+class BloomFilter:
+    """Compact set of strings that answers "definitely not present" or "maybe present".
+
+    Sized for ``capacity`` items at a false-positive rate of ``error_rate``; past
+    capacity the rate climbs, so owners rebuild it once ``saturated`` is set. Items
+    can't be removed – rebuild from the current set instead.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, int(capacity))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_items(cls, items, error_rate=0.001, headroom=2.0, min_capacity=1024):
+        """Filter holding ``items`` with room for ``headroom`` times as many before it saturates."""
+        items = list(items)
+        bloom = cls(max(min_capacity, len(items) * headroom), error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item):
+        # Double hashing: k indexes from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8', 'replace'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def saturated(self):
+        return self.count > self.capacity
+
+    def stats(self):
+        return {'items': self.count, 'capacity': self.capacity, 'bits': self.size,
+                'hashes': self.hashes, 'bytes': len(self._bits)}
@@ -0,0 +1,108 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LicensePool:
+    """Reserve of pre-generated, pre-validated license codes stored in ``license_pool``.
+
+    ``kinds`` maps a license type to ``(generate, table)``: a function returning one random
+    code and the table whose ``license_code`` column must not already contain it.
+    claim() deletes one reserved code inside the caller's transaction, so a code is
+    either committed together with the license row that uses it or returned to the pool
+    on rollback – it can never be handed out twice, across restarts included. A
+    background thread tops each type back up to ``target_size`` once it drops to
+    ``low_water`` (and every ``check_interval`` seconds regardless).
+    """
+
+    def __init__(self, connect, kinds, target_size=200, low_water=50, check_interval=300):
+        self._connect = connect
+        self.kinds = kinds
+        self.target_size = target_size
+        self.low_water = low_water
+        self.check_interval = check_interval
+        self._estimates = {kind: 0 for kind in kinds}   # approximate reserve sizes
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'claimed': 0, 'empty': 0, 'refilled': 0}
+
+    def claim(self, cursor, kind):
+        """Take one reserved code of ``kind`` within the cursor's transaction, or None if empty."""
+        cursor.execute("""
+            DELETE TOP (1) FROM license_pool WITH (ROWLOCK, READPAST)
+            OUTPUT deleted.license_code
+            WHERE license_type = ?
+        """, (kind,))
+        row = cursor.fetchone()
+        if row is None:
+            self._stats['empty'] += 1
+            self._wake.set()
+            return None
+        self._stats['claimed'] += 1
+        self._estimates[kind] -= 1
+        if self._estimates[kind] <= self.low_water:
+            self._wake.set()
+        return row[0]
+
+    def refill(self, kind):
+        """Top ``kind`` up to target_size; returns how many codes were added."""
+        generate, table = self.kinds[kind]
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM license_pool WHERE license_type = ?", (kind,))
+            available = cursor.fetchone()[0]
+            needed = self.target_size - available
+            if needed <= 0:
+                self._estimates[kind] = available
+                return 0
+            candidates = set()
+            while len(candidates) < needed:
+                candidates.add(generate())
+            cursor.execute("IF OBJECT_ID('tempdb..#pool_candidates') IS NOT NULL DROP TABLE #pool_candidates")
+            cursor.execute("CREATE TABLE #pool_candidates (license_code NVARCHAR(50) PRIMARY KEY)")
+            cursor.fast_executemany = True
+            cursor.executemany("INSERT INTO #pool_candidates (license_code) VALUES (?)", [(c,) for c in candidates])
+            cursor.execute(f"""
+                INSERT INTO license_pool (license_code, license_type)
+                SELECT c.license_code, ?
+                FROM #pool_candidates c
+                WHERE NOT EXISTS (SELECT 1 FROM license_pool p WHERE p.license_code = c.license_code)
+                  AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.license_code = c.license_code)
+            """, (kind,))
+            added = cursor.rowcount
+            cursor.execute("DROP TABLE #pool_candidates")
+            conn.commit()
+            self._estimates[kind] = available + added
+            self._stats['refilled'] += added
+            logger.info(f"📦 License pool '{kind}' refilled with {added} codes ({available + added} reserved)")
+            return added
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="license-pool", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for kind in self.kinds:
+                try:
+                    self.refill(kind)
+                except Exception as e:
+                    logger.warning(f"License pool refill for '{kind}' failed: {e}")
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self):
+        return {**self._stats, 'reserved': dict(self._estimates)}
@@ -0,0 +1,65 @@
+import asyncio
+from collections import deque
+
+OVERFLOW_POLICIES = ('drop_oldest', 'sample')
+
+class LineQueue:
+    """Bounded asyncio queue of output lines for one bot.
+
+    put_nowait() never blocks the stderr reader. Once ``maxsize`` lines are waiting the
+    ``overflow`` policy decides: 'drop_oldest' evicts the oldest line for every new one,
+    'sample' keeps only every ``sample_every``-th new line (still evicting the oldest) so
+    a flood is thinned out instead of replacing the whole backlog. get() returns None
+    once the queue has been closed and drained.
+    """
+
+    def __init__(self, maxsize=1000, overflow='drop_oldest', sample_every=10):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self._lines = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._over = 0            # lines offered while full, for sampling
+        self._stats = {'received': 0, 'dropped': 0, 'processed': 0, 'max_depth': 0}
+
+    def __len__(self):
+        return len(self._lines)
+
+    def put_nowait(self, line):
+        """Queue one line; returns False if the overflow policy dropped it (or another line)."""
+        self._stats['received'] += 1
+        accepted = True
+        if len(self._lines) >= self.maxsize:
+            self._over += 1
+            if self.overflow == 'sample' and self._over % self.sample_every:
+                self._stats['dropped'] += 1
+                return False
+            self._lines.popleft()
+            self._stats['dropped'] += 1
+            accepted = False
+        else:
+            self._over = 0
+        self._lines.append(line)
+        self._stats['max_depth'] = max(self._stats['max_depth'], len(self._lines))
+        self._ready.set()
+        return accepted
+
+    async def get(self):
+        while not self._lines:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self._stats['processed'] += 1
+        return self._lines.popleft()
+
+    def close(self):
+        """No more lines will arrive; wake the consumer so it can finish the backlog and exit."""
+        self._closed = True
+        self._ready.set()
+
+    def stats(self):
+        return {**self._stats, 'depth': len(self._lines)}
@@ -1,16 +1,20 @@
 import discord
 from discord.ext import commands
 import logging
-import hashlib
-import hmac
+import asyncio
 from datetime import datetime, timezone
 
 from config import (
-    MASTER_SECRET, EMOJIS, COLORS, FOOTER_TEXT,
-    VERIFY_CHANNEL, LOG_CHANNEL
+    EMOJIS, COLORS, FOOTER_TEXT,
+    VERIFY_CHANNEL, LOG_CHANNEL, LOCAL_ENDPOINT, VERIFY_BATCH, REPLY_THROTTLE
 )
 import database as db
 import selffix
+from handshake import sign_license, verify_proof
+import session_tokens
+from local_endpoint import LocalEndpoint
+from reply_throttle import ReplyThrottle
+from verification_batcher import VerificationBatcher
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,28 @@ class MasterListener(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.log_channel = None
+        # Handshakes arriving together (e.g. the whole fleet booting) share one lookup
+        self.verifier = VerificationBatcher(db.aio.verify_bot_licenses, **VERIFY_BATCH)
+        # Authors that keep posting invalid licenses are ignored for exponentially longer
+        self.reply_throttle = ReplyThrottle(**REPLY_THROTTLE)
+        self.local_endpoint = None
+        if LOCAL_ENDPOINT['path']:
+            self.local_endpoint = LocalEndpoint(
+                LOCAL_ENDPOINT['path'], self.check_license, self.record_error_report,
+                LOCAL_ENDPOINT['mode'], LOCAL_ENDPOINT['max_request'], resume=self.resume_session,
+                prove=self.check_proof)
+
+    async def cog_load(self):
+        if self.local_endpoint:
+            try:
+                await self.local_endpoint.start()
+            except OSError as e:
+                logger.error(f"❌ Could not open local endpoint {LOCAL_ENDPOINT['path']}: {e}")
+                self.local_endpoint = None
+
+    async def cog_unload(self):
+        if self.local_endpoint:
+            await self.local_endpoint.stop()
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -46,6 +72,12 @@ class MasterListener(commands.Cog):
 
         embed = message.embeds[0]
 
+        # ----- SESSION RESUME: a token from an earlier verification, checked offline -----
+        for field in embed.fields:
+            if field.name.lower() == "session":
+                await self.handle_resume(message, field.value.strip('` '))
+                return
+
         # ----- VERIFICATION REQUEST: look for field named "License" -----
         license_field = None
         for field in embed.fields:
@@ -55,6 +87,11 @@ class MasterListener(commands.Cog):
 
         if license_field:
             license_code = license_field.value.strip('` ')
+            # A bot presenting a proof it was given earlier (heartbeat) rather than asking for one
+            proof = {f.name.lower(): f.value.strip('` ') for f in embed.fields if f.name.lower() in ("timestamp", "signature")}
+            if len(proof) == 2:
+                await self.handle_proof(message, license_code, proof['timestamp'], proof['signature'])
+                return
             await self.handle_verification(message, license_code)
             return
 
@@ -72,17 +109,127 @@ class MasterListener(commands.Cog):
                 await self.handle_error_report(message, license_code, error_msg)
                 return
 
+    async def check_license(self, license_code: str):
+        """(valid, timestamp, signature, token, expires) for a license, or None if it can't be decided yet.
+
+        Shared by the #bot-verify flow and the local endpoint. A valid license also gets a
+        session token the bot can present after a restart instead of verifying again.
+        """
+        if not db.license_may_exist(license_code):
+            # Unknown to the license filter, but another process may have issued it since the
+            # last index refresh – catch up before calling it invalid (and striking the sender)
+            try:
+                confirmed = await db.aio.refresh_license_index_for_miss()
+            except Exception as e:
+                logger.warning(f"⚠️ License index refresh failed for {license_code}: {e}")
+                return None
+            if not db.license_may_exist(license_code):
+                if not confirmed:
+                    # Only the filter says no and a refresh ran moments ago – let the child retry
+                    logger.info(f"🔍 Unknown bot license, not yet confirmed: {license_code}")
+                    return None
+                logger.warning(f"❌ Unknown bot license attempt: {license_code}")
+                return False, None, None, None, None
+        try:
+            is_valid = await self.verifier.verify(license_code)
+        except asyncio.TimeoutError:
+            # Database is slow – stay silent so the child retries instead of seeing "invalid"
+            logger.warning(f"⏱️ Verification timed out for license: {license_code}")
+            return None
+        except Exception as e:
+            # Lookup failed (e.g. a dropped connection) – same as a timeout, the child retries
+            logger.warning(f"⚠️ Verification failed for license {license_code}: {e}")
+            return None
+        if not is_valid:
+            logger.warning(f"❌ Invalid bot license attempt: {license_code}")
+            return False, None, None, None, None
+        timestamp, signature = sign_license(license_code)
+        token, expires = session_tokens.issue_token(license_code)
+        logger.info(f"✅ Verified bot license: {license_code}")
+        return True, timestamp, signature, token, expires
+
+    async def resume_session(self, token: str):
+        """``(verdict, (license, timestamp, signature, expires))`` for a session token.
+
+        The second item is None unless verdict is 'ok'; otherwise verdict is one of
+        session_tokens.inspect_token()'s, and the bot has to verify its license again.
+        No database round trip: the token and the license index are checked in memory
+        and the heartbeat is recorded through the coalesced writer.
+        """
+        verdict, claims = session_tokens.inspect_token(token, 'resume')
+        if verdict == 'ok' and db.is_license_deactivated(claims['license']):
+            # Deactivated outside this process (e.g. directly in SQL) – seen via the index refresh
+            session_tokens.revoke(claims['license'])
+            verdict = 'revoked'
+        if verdict != 'ok':
+            logger.info(f"🔑 Rejected {verdict} session token")
+            return verdict, None
+        license_code = claims['license']
+        db.touch_bot_license(license_code)
+        timestamp, signature = sign_license(license_code)
+        logger.info(f"✅ Resumed session for bot license: {license_code}")
+        return 'ok', (license_code, timestamp, signature, claims['expires'])
+
+    def check_proof(self, license_code: str, timestamp: str, signature: str) -> str:
+        """Validate a presented (license, timestamp, signature) proof; returns verify_proof()'s verdict.
+
+        Signature, skew window, replay and license status are all checked in memory;
+        a good proof counts as a heartbeat. A proof for a license deactivated since it
+        was signed gets 'revoked'.
+        """
+        verdict = verify_proof(license_code, timestamp, signature)
+        if verdict == 'ok' and (db.is_license_deactivated(license_code)
+                                or session_tokens.is_revoked(license_code, timestamp)):
+            verdict = 'revoked'
+        if verdict == 'ok':
+            db.touch_bot_license(license_code)
+        else:
+            logger.warning(f"❌ Rejected {verdict} proof for license: {license_code}")
+        return verdict
+
+    async def handle_proof(self, message: discord.Message, license_code: str, timestamp: str, signature: str):
+        """Acknowledge a presented proof with a reaction, or explain why it was rejected."""
+        if self.reply_throttle.muted(message.author.id):
+            return
+        verdict = self.check_proof(license_code, timestamp, signature)
+        if verdict == 'ok':
+            self.reply_throttle.clear(message.author.id)
+            await message.add_reaction(EMOJIS['success'])
+            return
+        reasons = {
+            'forged': "The signature does not match this license and timestamp.",
+            'stale': "The timestamp is outside the accepted window – verify with your License again.",
+            'replay': "This proof has already been presented – verify with your License again.",
+            'revoked': "This license has been deactivated.",
+        }
+        description = reasons[verdict]
+        # Stale and replayed proofs are routine heartbeat outcomes; only forgeries are punished,
+        # so the re-verification we ask for isn't ignored
+        if verdict == 'forged':
+            backoff = self.reply_throttle.strike(message.author.id)
+            description += f"\nFurther requests from this account are ignored for {backoff:.0f}s."
+        reply_embed = discord.Embed(
+            title=f"{EMOJIS['error']} Proof Rejected",
+            description=description,
+            color=COLORS['error'],
+            timestamp=datetime.now(timezone.utc)
+        )
+        reply_embed.set_footer(text=FOOTER_TEXT)
+        await message.reply(embed=reply_embed, mention_author=False)
+
     async def handle_verification(self, message: discord.Message, license_code: str):
         """Process a verification request, reply with signed embed."""
-        is_valid = db.verify_bot_license(license_code)
+        muted = self.reply_throttle.muted(message.author.id)
+        if muted:
+            logger.debug(f"🔇 Ignoring verification from {message.author.id} for another {muted:.0f}s")
+            return
+        result = await self.check_license(license_code)
+        if result is None:
+            return
+        is_valid, timestamp, signature, token, expires = result
 
         if is_valid:
-            timestamp = str(int(datetime.now(timezone.utc).timestamp()))
-            signature = hmac.new(
-                MASTER_SECRET.encode(),
-                f"{license_code}:{timestamp}".encode(),
-                hashlib.sha256
-            ).hexdigest()
+            self.reply_throttle.clear(message.author.id)
 
             reply_embed = discord.Embed(
                 title=f"{EMOJIS['verified']} License Verified",
@@ -92,30 +239,70 @@ class MasterListener(commands.Cog):
             reply_embed.add_field(name="License", value=f"`{license_code}`", inline=True)
             reply_embed.add_field(name="Timestamp", value=f"`{timestamp}`", inline=True)
             reply_embed.add_field(name="Signature", value=f"`{signature}`", inline=False)
+            reply_embed.add_field(name="Session", value=f"`{token}`", inline=False)
+            reply_embed.add_field(name="Session Expires", value=f"<t:{expires}:R>", inline=True)
             reply_embed.add_field(
                 name="Instructions",
-                value="Your bot is now authorized. Use `/fetch_patches` to get updates.",
+                value="Your bot is now authorized. Use `/fetch_patches` to get updates. "
+                      "After a restart, post the Session token instead of the License.",
                 inline=False
             )
             reply_embed.set_footer(text=FOOTER_TEXT)
 
             await message.reply(embed=reply_embed, mention_author=False)
-            logger.info(f"✅ Verified bot license: {license_code}")
         else:
+            backoff = self.reply_throttle.strike(message.author.id)
             reply_embed = discord.Embed(
                 title=f"{EMOJIS['error']} License Invalid",
-                description=f"License `{license_code}` is not active or does not exist.",
+                description=f"License `{license_code}` is not active or does not exist.\n"
+                            f"Further requests from this account are ignored for {backoff:.0f}s.",
                 color=COLORS['error'],
                 timestamp=datetime.now(timezone.utc)
             )
             reply_embed.set_footer(text=FOOTER_TEXT)
             await message.reply(embed=reply_embed, mention_author=False)
-            logger.warning(f"❌ Invalid bot license attempt: {license_code}")
+
+    async def handle_resume(self, message: discord.Message, token: str):
+        """Re-authorize a restarted bot from its session token, without touching SQL."""
+        if self.reply_throttle.muted(message.author.id):
+            return
+        verdict, result = await self.resume_session(token)
+        if result is None:
+            description = {
+                'expired': "The session token has expired – verify with your License again.",
+                'revoked': "The session token was revoked – verify with your License again.",
+            }.get(verdict, "The session token is invalid – verify with your License again.")
+            # An expired or revoked token is routine; only forged or garbled tokens are punished,
+            # so the License post we ask for isn't ignored
+            if verdict in ('forged', 'malformed'):
+                backoff = self.reply_throttle.strike(message.author.id)
+                description += f"\nFurther requests from this account are ignored for {backoff:.0f}s."
+            reply_embed = discord.Embed(
+                title=f"{EMOJIS['error']} Session Expired",
+                description=description,
+                color=COLORS['error'],
+                timestamp=datetime.now(timezone.utc)
+            )
+            reply_embed.set_footer(text=FOOTER_TEXT)
+            await message.reply(embed=reply_embed, mention_author=False)
+            return
+
+        self.reply_throttle.clear(message.author.id)
+        license_code, timestamp, signature, expires = result
+        reply_embed = discord.Embed(
+            title=f"{EMOJIS['verified']} Session Resumed",
+            color=COLORS['success'],
+            timestamp=datetime.now(timezone.utc)
+        )
+        reply_embed.add_field(name="License", value=f"`{license_code}`", inline=True)
+        reply_embed.add_field(name="Timestamp", value=f"`{timestamp}`", inline=True)
+        reply_embed.add_field(name="Signature", value=f"`{signature}`", inline=False)
+        reply_embed.add_field(name="Session Expires", value=f"<t:{expires}:R>", inline=True)
+        reply_embed.set_footer(text=FOOTER_TEXT)
+        await message.reply(embed=reply_embed, mention_author=False)
 
     async def handle_error_report(self, message: discord.Message, license_code: str, error_msg: str):
         """Log an error report, acknowledge, and forward to #bot-logs."""
-        db.log_bot_error(license_code, error_msg)
-
         # Acknowledge receipt
         ack_embed = discord.Embed(
             title=f"{EMOJIS['info']} Error Logged",
@@ -126,6 +313,15 @@ class MasterListener(commands.Cog):
         ack_embed.set_footer(text=FOOTER_TEXT)
         await message.reply(embed=ack_embed, mention_author=False)
 
+        await self.record_error_report(license_code, error_msg, f"{message.author.mention} (`{message.author.id}`)")
+
+    async def record_error_report(self, license_code: str, error_msg: str, reporter: str):
+        """Store an error report and forward it to #bot-logs (Discord and local endpoint alike)."""
+        try:
+            await db.aio.log_bot_error(license_code, error_msg)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Timed out logging error for license: {license_code}")
+
         # Forward to dedicated log channel if available
         if self.log_channel:
             log_embed = discord.Embed(
@@ -137,7 +333,7 @@ class MasterListener(commands.Cog):
             log_embed.add_field(name="License", value=f"`{license_code}`", inline=True)
             log_embed.add_field(
                 name="Reporter",
-                value=f"{message.author.mention} (`{message.author.id}`)",
+                value=reporter,
                 inline=True
             )
             log_embed.set_footer(text=FOOTER_TEXT)
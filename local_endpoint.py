@@ -0,0 +1,173 @@
+import os
+import json
+import errno
+import socket
+import struct
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PEERCRED = struct.Struct('3i')   # pid, uid, gid
+
+class LocalEndpoint:
+    """Unix-socket twin of the #bot-verify channel for child bots on the same host.
+
+    Speaks newline-delimited JSON, any number of requests per connection:
+
+        {"op": "verify", "license": "ABCD-..."}
+          -> {"ok": true, "valid": true, "license": ..., "timestamp": ..., "signature": ...,
+              "token": ..., "expires": ...}
+        {"op": "resume", "token": "..."}
+          -> {"ok": true, "valid": true, "verdict": "ok", "license": ..., "timestamp": ..., "signature": ..., "expires": ...}
+        {"op": "prove", "license": "ABCD-...", "timestamp": ..., "signature": ...}
+          -> {"ok": true, "valid": true, "verdict": "ok"}     (or "forged" / "stale" / "replay")
+        {"op": "error", "license": "ABCD-...", "error": "Traceback ..."}
+          -> {"ok": true, "logged": true}
+
+    ``verify(license_code)`` must return ``(valid, timestamp, signature, token, expires)``
+    or None when the database timed out; ``resume(token)`` returns ``(verdict, (license,
+    timestamp, signature, expires) or None)``; ``report(license_code, error, reporter)``
+    records an error report. These three are coroutines. ``prove(license_code, timestamp,
+    signature)`` is a plain function returning a verdict string, since the check is
+    in-memory. All are the callables the Discord flow uses, so the two paths share the
+    database and cache. The socket file gets ``mode`` permissions; access control is the file system's.
+    """
+
+    def __init__(self, path, verify, report, mode=0o660, max_request=65536, resume=None, prove=None):
+        self.path = path
+        self.verify = verify
+        self.report = report
+        self.resume = resume
+        self.prove = prove
+        self.mode = mode
+        self.max_request = max_request
+        self._server = None
+        self._clients = set()
+        self._stats = {'connections': 0, 'verify': 0, 'resume': 0, 'prove': 0, 'error': 0, 'bad_requests': 0}
+
+    async def start(self):
+        """Listen on ``path``; raises OSError (EADDRINUSE) if another process is serving it."""
+        if os.path.exists(self.path):
+            if self._in_use():
+                raise OSError(errno.EADDRINUSE, f"another process is listening on {self.path}")
+            os.unlink(self.path)     # stale socket from a previous run
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Bind owner-only, then widen to ``mode``, so the socket is never briefly open to everyone
+        umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, self.mode)
+        self._server = await asyncio.start_unix_server(self._serve, sock=sock, limit=self.max_request)
+        logger.info(f"🔌 Local verification endpoint listening on {self.path}")
+
+    def _in_use(self):
+        """Whether something accepts connections on ``path`` (anything but a refusal counts)."""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(1.0)
+        try:
+            probe.connect(self.path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        except OSError:
+            return True
+        finally:
+            probe.close()
+        return True
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _peer(self, writer):
+        sock = writer.get_extra_info('socket')
+        try:
+            pid, uid, _ = _PEERCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEERCRED.size))
+            return f"local pid {pid} (uid {uid})"
+        except (AttributeError, OSError):
+            return "local socket"
+
+    async def _serve(self, reader, writer):
+        self._stats['connections'] += 1
+        peer = self._peer(writer)
+        self._clients.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Request longer than max_request – the stream can't be resynchronised
+                    self._stats['bad_requests'] += 1
+                    await self._reply(writer, {'ok': False, 'error': 'request too large'})
+                    break
+                if not line:
+                    break
+                await self._reply(writer, await self._handle(line, peer))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _reply(self, writer, response):
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def _handle(self, line, peer):
+        try:
+            request = json.loads(line)
+            op = request['op']
+            if op == 'resume' and self.resume:
+                token = str(request['token']).strip()
+            else:
+                license_code = str(request['license']).strip()
+        except (ValueError, KeyError, TypeError):
+            self._stats['bad_requests'] += 1
+            return {'ok': False, 'error': 'expected {"op": ..., "license": ...} or {"op": "resume", "token": ...}'}
+
+        if op == 'resume' and self.resume:
+            self._stats['resume'] += 1
+            verdict, result = await self.resume(token)
+            if result is None:
+                return {'ok': True, 'valid': False, 'verdict': verdict}
+            license_code, timestamp, signature, expires = result
+            return {'ok': True, 'valid': True, 'verdict': verdict, 'license': license_code, 'timestamp': timestamp,
+                    'signature': signature, 'expires': expires}
+
+        if op == 'prove' and self.prove:
+            self._stats['prove'] += 1
+            verdict = self.prove(license_code, str(request.get('timestamp', '')), str(request.get('signature', '')))
+            return {'ok': True, 'valid': verdict == 'ok', 'verdict': verdict}
+
+        if op == 'verify':
+            self._stats['verify'] += 1
+            result = await self.verify(license_code)
+            if result is None:
+                return {'ok': False, 'error': 'timeout', 'retry': True}
+            valid, timestamp, signature, token, expires = result
+            if not valid:
+                return {'ok': True, 'valid': False, 'license': license_code}
+            return {'ok': True, 'valid': True, 'license': license_code, 'timestamp': timestamp,
+                    'signature': signature, 'token': token, 'expires': expires}
+
+        if op == 'error':
+            self._stats['error'] += 1
+            await self.report(license_code, str(request.get('error') or 'Unknown error'), peer)
+            return {'ok': True, 'logged': True}
+
+        self._stats['bad_requests'] += 1
+        return {'ok': False, 'error': f'unknown op {op!r}'}
+
+    def stats(self):
+        return dict(self._stats)
@@ -4,9 +4,10 @@ import logging
 import sys
 from datetime import datetime
 
-from config import BOT_TOKEN, COLORS, FOOTER_TEXT
+from config import BOT_TOKEN, COLORS, FOOTER_TEXT, BOTS_BASE_PATH, BOT_PATH_SCAN
 import database as db
 import selffix
+from path_watcher import DirectoryWatcher
 
 # ----- Logging setup (colours) -----
 class ColourFormatter(logging.Formatter):
@@ -55,6 +56,11 @@ class MasterBot(commands.Bot):
         intents.message_content = True   # needed to read DMs
         intents.guilds = True
         super().__init__(command_prefix="!", intents=intents)
+        # Keeps bot_licenses.bot_path current as bot folders appear or their config.py changes
+        self.path_watcher = DirectoryWatcher(
+            BOTS_BASE_PATH, "config.py", db.refresh_bot_configs, depth=1,
+            debounce=BOT_PATH_SCAN['debounce'], poll_interval=BOT_PATH_SCAN['poll_interval']
+        )
         self.initial_extensions = [
             "commands", 
             "listener", 
@@ -70,11 +76,13 @@ class MasterBot(commands.Bot):
     async def setup_hook(self):
         # Init DB
         try:
-            db.init_db()
+            # No timeout: first boot may have to create the whole schema
+            await db.aio.init_db(timeout=None)
             logger.info("✅ Database ready.")
         except Exception as e:
             logger.critical(f"❌ Database init failed: {e}")
             sys.exit(1)
+        self.path_watcher.start()
 
         # Load cogs
         for ext in self.initial_extensions:
@@ -94,6 +102,11 @@ class MasterBot(commands.Bot):
             await selffix.ensure_verification_setup(self, guild)
         logger.info("🚀 Master Bot ready.")
 
+    async def close(self):
+        await super().close()
+        self.path_watcher.stop()
+        db.shutdown()
+
 bot = MasterBot()
 
 if __name__ == "__main__":
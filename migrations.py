@@ -0,0 +1,190 @@
+"""
+Versioned schema migrations for the master bot database.
+
+Each step is a list of idempotent T-SQL statements (guarded with IF NOT EXISTS /
+COL_LENGTH checks, so they are safe on installs that predate ``schema_version``).
+A step and its ``schema_version`` row commit together. Once the database is current,
+migrate() costs a single SELECT.
+"""
+import pyodbc
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _create_table(name, body):
+    return f"""
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{name}' AND xtype='U')
+        CREATE TABLE {name} ({body})
+    """
+
+def _add_column(table, column, definition):
+    return f"IF COL_LENGTH('{table}', '{column}') IS NULL ALTER TABLE {table} ADD {column} {definition}"
+
+def _create_index(name, table, columns):
+    return f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('{table}'))
+        CREATE INDEX {name} ON {table} ({columns})
+    """
+
+# (version, description, statements) – append new steps, never edit applied ones
+MIGRATIONS = [
+    (1, "base master-bot tables", [
+        # ----- Bot Licenses (handshake bot authentication) -----
+        _create_table('bot_licenses', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            license_code NVARCHAR(50) UNIQUE NOT NULL,
+            bot_name NVARCHAR(100) NOT NULL,
+            is_active BIT DEFAULT 1,
+            created_at DATETIME DEFAULT GETDATE(),
+            last_verified DATETIME,
+            owner_id BIGINT,
+            bot_path NVARCHAR(500) NULL
+        """),
+        # ----- Error Logs -----
+        _create_table('error_logs', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_license NVARCHAR(50) NOT NULL,
+            error_message NVARCHAR(MAX) NOT NULL,
+            timestamp DATETIME DEFAULT GETDATE(),
+            forwarded BIT DEFAULT 0
+        """),
+        # ----- Patch History -----
+        _create_table('patches', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_license NVARCHAR(50) NOT NULL,
+            filename NVARCHAR(255) NOT NULL,
+            applied_at DATETIME DEFAULT GETDATE()
+        """),
+        # ----- User Licenses -----
+        _create_table('user_licenses', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            license_code NVARCHAR(50) UNIQUE NOT NULL,
+            product_name NVARCHAR(100) NOT NULL,
+            is_active BIT DEFAULT 1,
+            expiration_date DATE,
+            assigned_to BIGINT,
+            giveaway_id INT,
+            created_at DATETIME DEFAULT GETDATE()
+        """),
+        # ----- Solution Logs -----
+        _create_table('solution_logs', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_license NVARCHAR(50),
+            bot_name NVARCHAR(100),
+            error_type NVARCHAR(255),
+            solution_file NVARCHAR(255),
+            applied_at DATETIME DEFAULT GETDATE(),
+            success BIT DEFAULT 1,
+            details NVARCHAR(MAX)
+        """),
+        # ----- Error Events -----
+        _create_table('error_events', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_license NVARCHAR(50),
+            bot_name NVARCHAR(100),
+            error_text NVARCHAR(MAX),
+            matched_solution NVARCHAR(255),
+            notified_admin BIT DEFAULT 0,
+            occurred_at DATETIME DEFAULT GETDATE()
+        """),
+        # ----- Patch Tracking -----
+        _create_table('patch_tracking', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_license NVARCHAR(50),
+            bot_name NVARCHAR(100),
+            patch_filename NVARCHAR(255),
+            downloaded_at DATETIME DEFAULT GETDATE(),
+            dm_sent BIT DEFAULT 0
+        """),
+        # ----- Bot Duplications Log -----
+        _create_table('bot_duplications', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            folder_name NVARCHAR(255) NOT NULL,
+            bot_token NVARCHAR(100) NOT NULL,
+            license_code NVARCHAR(50),
+            created_at DATETIME DEFAULT GETDATE()
+        """),
+    ]),
+    (2, "bot_licenses.bot_path for pre-path installs", [
+        _add_column('bot_licenses', 'bot_path', 'NVARCHAR(500) NULL'),
+    ]),
+    (3, "bot_licenses.row_version change marker", [
+        _add_column('bot_licenses', 'row_version', 'ROWVERSION'),
+    ]),
+    (4, "license_pool of pre-generated codes", [
+        _create_table('license_pool', """
+            license_code NVARCHAR(50) PRIMARY KEY,
+            license_type NVARCHAR(10) NOT NULL,
+            reserved_at DATETIME DEFAULT GETDATE()
+        """),
+    ]),
+    (5, "indexes for hot lookups", [
+        _create_index('IX_bot_licenses_bot_path', 'bot_licenses', 'bot_path'),
+        _create_index('IX_bot_licenses_row_version', 'bot_licenses', 'row_version'),
+        _create_index('IX_error_logs_license_time', 'error_logs', 'bot_license, timestamp'),
+        _create_index('IX_solution_logs_license_time', 'solution_logs', 'bot_license, applied_at'),
+        _create_index('IX_patch_tracking_license', 'patch_tracking', 'bot_license'),
+    ]),
+    (6, "error_events.fingerprint of the normalised error", [
+        _add_column('error_events', 'fingerprint', 'NVARCHAR(64) NULL'),
+        _create_index('IX_error_events_fingerprint', 'error_events', 'fingerprint, occurred_at'),
+    ]),
+    (7, "restart_history for the restart scheduler", [
+        _create_table('restart_history', """
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            bot_path NVARCHAR(500) NOT NULL,
+            outcome NVARCHAR(20) NOT NULL,
+            delay_seconds FLOAT,
+            reason NVARCHAR(255),
+            restarted_at DATETIME DEFAULT GETDATE()
+        """),
+        _create_index('IX_restart_history_path_time', 'restart_history', 'bot_path, restarted_at'),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(cursor):
+    """Highest applied migration, or 0 when schema_version doesn't exist yet."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+        return row[0] or 0
+    except pyodbc.ProgrammingError:
+        cursor.connection.rollback()
+        return 0
+
+def migrate(connect):
+    """Apply every pending migration in order; returns the resulting schema version."""
+    conn = connect()
+    cursor = conn.cursor()
+    version = 0
+    try:
+        version = current_version(cursor)
+        if version >= LATEST_VERSION:
+            return version
+        cursor.execute(_create_table('schema_version', """
+            version INT PRIMARY KEY,
+            description NVARCHAR(255) NOT NULL,
+            applied_at DATETIME DEFAULT GETDATE()
+        """))
+        conn.commit()
+        for step, description, statements in MIGRATIONS:
+            if step <= version:
+                continue
+            logger.info(f"Applying schema migration {step}: {description}...")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (step, description))
+            conn.commit()
+            version = step
+        logger.info(f"✅ Database schema at version {version}.")
+        return version
+    except pyodbc.Error as e:
+        logger.error(f"Schema migration failed at version {version + 1}: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 import logging
+import asyncio
 from datetime import datetime, timezone
 
 from config import ADMIN_USER_ID, PATCH_CHANNEL
@@ -52,11 +53,15 @@ class PatchTracker(commands.Cog):
             return
         _, license_code, filename = parts
 
-        # Get bot name
-        bot_name = db.get_bot_name_by_license(license_code) or "Unknown"
+        try:
+            # Get bot name
+            bot_name = await db.aio.get_bot_name_by_license(license_code) or "Unknown"
 
-        # Log the download
-        db.log_patch_download(license_code, bot_name, filename)
+            # Log the download
+            await db.aio.log_patch_download(license_code, bot_name, filename)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Timed out logging patch download for license: {license_code}")
+            return
 
         # Optionally notify admin
         admin = self.bot.get_user(ADMIN_USER_ID)
@@ -0,0 +1,210 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_FILE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_DIR_MASK = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify (no third-party dependency)."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.paths = {}   # {watch descriptor: directory}
+
+    def add(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.paths[wd] = path
+
+    def read(self):
+        """Yield (directory, mask, name) for every queued event."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            directory = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+            yield directory, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+class DirectoryWatcher:
+    """Debounced change feed for files matching ``pattern`` under ``root``.
+
+    ``depth=0`` watches files directly in ``root``; ``depth=1`` watches files inside each
+    immediate subfolder (e.g. ``/Work/*/config.py``), picking up new subfolders as they
+    appear. Uses inotify where available and falls back to polling (mtime, size)
+    snapshots every ``poll_interval`` seconds. ``on_change`` runs on the watcher thread
+    with the set of changed file paths once no event arrived for ``debounce`` seconds,
+    or with None when events were lost and the caller should rescan everything.
+    """
+
+    def __init__(self, root, pattern, on_change, depth=0, debounce=1.0, poll_interval=10.0):
+        self.root = root
+        self.pattern = pattern
+        self.on_change = on_change
+        self.depth = depth
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"watch-{os.path.basename(self.root)}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _emit(self, changed):
+        try:
+            self.on_change(changed)
+        except Exception as e:
+            logger.error(f"Watcher callback for {self.root} failed: {e}")
+
+    def _run(self):
+        try:
+            inotify = _Inotify()
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable ({e}), polling {self.root} every {self.poll_interval}s")
+            self._poll()
+            return
+        try:
+            self._watch(inotify)
+        except OSError as e:
+            if e.errno not in (errno.ENOSPC, errno.EMFILE):
+                raise
+            logger.warning(f"inotify watch limit reached ({e}), polling {self.root} instead")
+            self._poll()
+        finally:
+            inotify.close()
+
+    # ----- inotify mode -----
+    def _watch(self, inotify):
+        self.mode = 'inotify'
+        if self.depth == 0:
+            inotify.add(self.root, _FILE_MASK)
+        else:
+            inotify.add(self.root, _DIR_MASK)
+            for sub in self._subdirs():
+                self._add_subdir(inotify, sub)
+        logger.info(f"👀 Watching {os.path.join(self.root, *(['*'] * self.depth), self.pattern)} with inotify")
+
+        pending = set()
+        overflow = False
+        last_event = 0.0
+        while not self._stop.is_set():
+            # Sleep only until the debounce deadline, so a stream of unrelated events can't starve the flush
+            if pending or overflow:
+                timeout = max(0.0, last_event + self.debounce - time.monotonic())
+            else:
+                timeout = 1.0
+            ready, _, _ = select.select([inotify.fd], [], [], timeout)
+            if ready:
+                before = (len(pending), overflow)
+                for directory, mask, name in inotify.read():
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                    elif directory is None:
+                        continue
+                    elif self.depth == 1 and directory == self.root:
+                        if mask & IN_ISDIR:
+                            sub = os.path.join(self.root, name)
+                            if mask & (IN_CREATE | IN_MOVED_TO):
+                                self._add_subdir(inotify, sub)
+                            # The folder appeared or vanished – whatever config it holds changed too
+                            pending.update(self._candidates(sub))
+                    elif fnmatch.fnmatch(name, self.pattern):
+                        pending.add(os.path.join(directory, name))
+                # Only relevant events extend the quiet period; unrelated writes must not postpone the rescan
+                if (len(pending), overflow) != before:
+                    last_event = time.monotonic()
+            if (pending or overflow) and time.monotonic() - last_event >= self.debounce:
+                changed, pending = pending, set()
+                self._emit(None if overflow else changed)
+                overflow = False
+
+    def _add_subdir(self, inotify, sub):
+        try:
+            inotify.add(sub, _FILE_MASK)
+        except FileNotFoundError:
+            pass
+
+    def _subdirs(self):
+        try:
+            with os.scandir(self.root) as entries:
+                return [entry.path for entry in entries if entry.is_dir()]
+        except OSError as e:
+            logger.error(f"Error scanning {self.root}: {e}")
+            return []
+
+    def _candidates(self, directory):
+        """Files in ``directory`` that match (the literal name is returned even if absent)."""
+        if not any(ch in self.pattern for ch in '*?['):
+            return [os.path.join(directory, self.pattern)]
+        try:
+            return [os.path.join(directory, n) for n in os.listdir(directory) if fnmatch.fnmatch(n, self.pattern)]
+        except OSError:
+            return []
+
+    # ----- polling mode -----
+    def _snapshot(self):
+        snapshot = {}
+        directories = [self.root] if self.depth == 0 else self._subdirs()
+        for directory in directories:
+            for path in self._candidates(directory):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _poll(self):
+        self.mode = 'poll'
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {p for p in previous.keys() | current.keys() if previous.get(p) != current.get(p)}
+            previous = current
+            if changed:
+                self._emit(changed)
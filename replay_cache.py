@@ -0,0 +1,54 @@
+import time
+
+class ReplayCache:
+    """Fixed-memory record of signed proofs already presented, for replay rejection.
+
+    A proof is accepted once, and only while its timestamp is within ``skew`` seconds
+    of now. Proofs live in a ring of ``2 * skew + 1`` per-second buckets indexed by
+    their own timestamp, so every acceptable second has a bucket and a bucket is
+    recycled as soon as its second falls out of the window – checks are O(1) and
+    memory is bounded by ``max_per_second`` entries per bucket however big the fleet.
+    When a bucket is full its oldest entry is evicted (that proof could then be
+    replayed); ``stats()['eviction_rate']`` shows how often that happens.
+    """
+
+    def __init__(self, skew=300, max_per_second=256, clock=time.time):
+        self.skew = int(skew)
+        self.max_per_second = max_per_second
+        self._clock = clock
+        size = 2 * self.skew + 1
+        self._seconds = [None] * size     # second each bucket currently holds
+        self._buckets = [{} for _ in range(size)]   # insertion-ordered, oldest first
+        self._stats = {'accepted': 0, 'replayed': 0, 'stale': 0, 'expired': 0, 'evicted': 0}
+
+    def check(self, timestamp, nonce):
+        """'ok' the first time ``nonce`` is seen for ``timestamp``, 'replay' after, 'stale' outside the window."""
+        try:
+            second = int(timestamp)
+        except (TypeError, ValueError):
+            self._stats['stale'] += 1
+            return 'stale'
+        if abs(self._clock() - second) > self.skew:
+            self._stats['stale'] += 1
+            return 'stale'
+        index = second % len(self._buckets)
+        bucket = self._buckets[index]
+        if self._seconds[index] != second:
+            self._stats['expired'] += len(bucket)
+            bucket.clear()
+            self._seconds[index] = second
+        elif nonce in bucket:
+            self._stats['replayed'] += 1
+            return 'replay'
+        if len(bucket) >= self.max_per_second:
+            del bucket[next(iter(bucket))]
+            self._stats['evicted'] += 1
+        bucket[nonce] = None
+        self._stats['accepted'] += 1
+        return 'ok'
+
+    def stats(self):
+        accepted = self._stats['accepted']
+        return {**self._stats,
+                'tracked': sum(len(b) for b in self._buckets),
+                'eviction_rate': self._stats['evicted'] / accepted if accepted else 0.0}
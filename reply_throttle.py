@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+
+class ReplyThrottle:
+    """Per-author exponential backoff for replies to failed requests.
+
+    Each strike mutes the author for ``base_delay * 2**(strikes-1)`` seconds (capped at
+    ``max_delay``); requests from a muted author get no reply and no lookup. Strikes are
+    forgotten after ``forget_after`` quiet seconds or on a successful request. At most
+    ``max_authors`` authors are tracked, least recently seen dropped first.
+    """
+
+    def __init__(self, base_delay=5.0, max_delay=600.0, forget_after=3600.0, max_authors=4096, clock=time.monotonic):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.forget_after = forget_after
+        self.max_authors = max_authors
+        self._clock = clock
+        self._authors = OrderedDict()     # {author_id: [strikes, muted_until, last_strike]}
+        self._stats = {'strikes': 0, 'suppressed': 0}
+
+    def muted(self, author_id):
+        """Seconds ``author_id`` stays muted (0 when a reply may be sent); counts suppressions."""
+        entry = self._authors.get(author_id)
+        if entry is None:
+            return 0
+        now = self._clock()
+        if now - entry[2] > self.forget_after:
+            del self._authors[author_id]
+            return 0
+        left = entry[1] - now
+        if left > 0:
+            self._stats['suppressed'] += 1
+            return left
+        return 0
+
+    def strike(self, author_id):
+        """Record a failed request; returns how long the author is now muted."""
+        now = self._clock()
+        entry = self._authors.pop(author_id, None)
+        if entry is None or now - entry[2] > self.forget_after:
+            entry = [0, 0.0, now]
+        entry[0] += 1
+        delay = min(self.max_delay, self.base_delay * (2 ** (entry[0] - 1)))
+        entry[1], entry[2] = now + delay, now
+        self._authors[author_id] = entry
+        while len(self._authors) > self.max_authors:
+            self._authors.popitem(last=False)
+        self._stats['strikes'] += 1
+        return delay
+
+    def clear(self, author_id):
+        self._authors.pop(author_id, None)
+
+    def stats(self):
+        now = self._clock()
+        return {**self._stats, 'muted': sum(1 for e in self._authors.values() if e[1] > now)}
@@ -0,0 +1,123 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class RestartScheduler:
+    """Per-bot restart policy: exponential backoff with jitter, crash-loop quarantine and a fleet-wide cap.
+
+    Each restart of a bot waits ``base_delay * 2**n`` seconds (n = restarts in the last
+    ``loop_window`` seconds, capped at ``max_delay``, ±``jitter`` fraction) before calling
+    ``restart(bot_path)``. A bot restarted ``loop_threshold`` times within ``loop_window``
+    is quarantined for ``quarantine`` seconds: further requests are refused until it
+    expires or release() is called. At most ``max_concurrent`` restarts run at once.
+    ``on_restart(bot_path, outcome, delay, reason)`` is called on the event loop for every
+    decision so the caller can persist the history (it must not block), and ``on_quarantine(bot_path, restarts)`` when a bot
+    is quarantined.
+    """
+
+    def __init__(self, restart, on_restart=None, on_quarantine=None, base_delay=5.0, max_delay=300.0,
+                 jitter=0.2, loop_threshold=5, loop_window=600, quarantine=1800, max_concurrent=2,
+                 clock=time.monotonic):
+        self._restart = restart
+        self._on_restart = on_restart
+        self._on_quarantine = on_quarantine
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.loop_threshold = loop_threshold
+        self.loop_window = loop_window
+        self.quarantine = quarantine
+        self.max_concurrent = max_concurrent
+        self._clock = clock
+        self._slots = None
+        self._history = {}        # {bot_path: deque of restart times, newest last}
+        self._quarantined = {}    # {bot_path: clock time the quarantine ends}
+        self._stats = {'restarted': 0, 'failed': 0, 'quarantined': 0, 'refused': 0}
+
+    def _recent(self, bot_path, now):
+        history = self._history.setdefault(bot_path, deque(maxlen=self.loop_threshold))
+        while history and now - history[0] > self.loop_window:
+            history.popleft()
+        return history
+
+    def seed(self, bot_path, ages):
+        """Restore restarts that happened ``ages`` seconds ago (from the persisted history)."""
+        now = self._clock()
+        history = self._recent(bot_path, now)
+        for age in sorted(ages, reverse=True):
+            if age <= self.loop_window:
+                history.append(now - age)
+
+    def delay_for(self, bot_path):
+        recent = len(self._recent(bot_path, self._clock()))
+        delay = min(self.max_delay, self.base_delay * (2 ** recent)) if recent else 0.0
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def quarantined_until(self, bot_path):
+        """Seconds of quarantine left for ``bot_path`` (0 when it may be restarted)."""
+        until = self._quarantined.get(bot_path)
+        if until is None:
+            return 0
+        left = until - self._clock()
+        if left <= 0:
+            del self._quarantined[bot_path]
+            self._history.pop(bot_path, None)
+            return 0
+        return left
+
+    async def schedule(self, bot_path, reason=None):
+        """Restart ``bot_path`` under the policy; returns 'restarted', 'failed' or 'quarantined'."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if self.quarantined_until(bot_path):
+            self._stats['refused'] += 1
+            self._record(bot_path, 'refused', 0.0, reason)
+            return 'quarantined'
+        history = self._recent(bot_path, self._clock())
+        if len(history) >= self.loop_threshold:
+            self._quarantined[bot_path] = self._clock() + self.quarantine
+            self._stats['quarantined'] += 1
+            logger.warning(f"🚫 {bot_path} restarted {len(history)} times in {self.loop_window}s – quarantined for {self.quarantine}s")
+            self._record(bot_path, 'quarantined', 0.0, reason)
+            if self._on_quarantine:
+                await self._on_quarantine(bot_path, len(history))
+            return 'quarantined'
+
+        delay = self.delay_for(bot_path)
+        history.append(self._clock())
+        if delay:
+            logger.info(f"⏳ Restarting {bot_path} in {delay:.1f}s (restart {len(history)} in window)")
+            await asyncio.sleep(delay)
+        async with self._slots:
+            try:
+                ok = await self._restart(bot_path)
+            except Exception as e:
+                logger.error(f"Error restarting {bot_path}: {e}")
+                ok = False
+        outcome = 'restarted' if ok else 'failed'
+        self._stats[outcome] += 1
+        self._record(bot_path, outcome, delay, reason)
+        return outcome
+
+    def _record(self, bot_path, outcome, delay, reason):
+        if self._on_restart:
+            try:
+                self._on_restart(bot_path, outcome, delay, reason)
+            except Exception as e:
+                logger.error(f"Failed to record restart of {bot_path}: {e}")
+
+    def release(self, bot_path):
+        """Lift a quarantine and forget the bot's restart history."""
+        self._quarantined.pop(bot_path, None)
+        self._history.pop(bot_path, None)
+
+    def stats(self):
+        now = self._clock()
+        return {
+            **self._stats,
+            'quarantined_bots': {path: round(until - now) for path, until in self._quarantined.items() if until > now},
+        }
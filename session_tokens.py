@@ -0,0 +1,82 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+from config import MASTER_SECRET, SESSION_TOKENS
+
+# Derived key, so a session token signature can never double as a license signature
+_KEY = hmac.new(MASTER_SECRET.encode(), b"session-token", hashlib.sha256).digest()
+
+_revoked = {}     # {license_code: unix time of revocation}
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload):
+    return hmac.new(_KEY, payload.encode(), hashlib.sha256).digest()
+
+def issue_token(license_code, capabilities=None, ttl=None, now=None):
+    """``(token, expires_at)`` for a license the master just verified.
+
+    The token is ``payload.signature`` in base64url: a compact JSON payload with the
+    license (``l``), capabilities (``c``), issue (``i``) and expiry (``e``) unix times,
+    signed with HMAC-SHA256 under a key derived from MASTER_SECRET.
+    """
+    issued = int(time.time() if now is None else now)
+    expires = issued + int(SESSION_TOKENS['ttl'] if ttl is None else ttl)
+    claims = {'l': license_code, 'c': list(SESSION_TOKENS['capabilities'] if capabilities is None else capabilities),
+              'i': issued, 'e': expires}
+    payload = _b64(json.dumps(claims, separators=(',', ':')).encode())
+    return f"{payload}.{_b64(_sign(payload))}", expires
+
+def inspect_token(token, capability=None, now=None):
+    """``(verdict, claims)`` for a presented token.
+
+    verdict is 'ok', 'malformed', 'forged', 'expired', 'revoked' or 'forbidden' (lacks
+    ``capability``); claims is None unless the signature checked out. Purely in-memory –
+    no database or network – so a restarted bot can resume its session without a full
+    license verification.
+    """
+    try:
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(_sign(payload), _unb64(signature)):
+            return 'forged', None
+        raw = json.loads(_unb64(payload))
+        claims = {'license': raw['l'], 'capabilities': raw.get('c', []), 'issued': raw['i'], 'expires': raw['e']}
+    except (AttributeError, ValueError, KeyError, TypeError):
+        return 'malformed', None
+    if (time.time() if now is None else now) >= claims['expires']:
+        return 'expired', claims
+    if is_revoked(claims['license'], claims['issued']):
+        return 'revoked', claims
+    if capability is not None and capability not in claims['capabilities']:
+        return 'forbidden', claims
+    return 'ok', claims
+
+def verify_token(token, capability=None, now=None):
+    """Claims of a valid token, or None if it is malformed, forged, expired, revoked or lacks ``capability``."""
+    verdict, claims = inspect_token(token, capability, now)
+    return claims if verdict == 'ok' else None
+
+def is_revoked(license_code, issued):
+    """True if ``license_code`` was revoked at or after unix time ``issued``."""
+    revoked_at = _revoked.get(license_code)
+    return revoked_at is not None and int(issued) <= revoked_at
+
+def revoke(license_code, now=None):
+    """Invalidate every token issued for ``license_code`` up to now."""
+    _revoked[license_code] = int(time.time() if now is None else now)
+
+def seed_revocations(license_codes):
+    """Revoke tokens of every license already inactive (called at startup)."""
+    now = int(time.time())
+    for code in license_codes:
+        _revoked[code] = now
+
+def revoked():
+    return dict(_revoked)
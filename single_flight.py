@@ -0,0 +1,76 @@
+import time
+import asyncio
+from collections import OrderedDict, defaultdict
+
+class SingleFlight:
+    """De-duplicates concurrent and repeated async jobs per key.
+
+    Keys are tuples whose first item is the bot path, e.g. ``(bot_path, solution,
+    fingerprint)``. run() starts a job only if none with the same key is in flight or
+    cooling down: a concurrent trigger joins the running job, and for ``cooldown``
+    seconds after it finishes further triggers are suppressed. Both are counted per bot.
+    At most ``max_keys`` finished keys are remembered.
+    """
+
+    def __init__(self, cooldown=120.0, max_keys=4096):
+        self.cooldown = cooldown
+        self.max_keys = max_keys
+        self._inflight = {}                 # {key: task}
+        self._cooling = OrderedDict()       # {key: monotonic time the cooldown ends}
+        self._stats = defaultdict(lambda: {'runs': 0, 'joined': 0, 'suppressed': 0})
+
+    def run(self, key, factory, cooldown=None):
+        """Return the task running ``key`` (new or joined), or None while it cools down.
+
+        ``factory`` is only called when a new job starts. Callers that await a possibly
+        shared task should wrap it in asyncio.shield() so cancelling one waiter doesn't
+        cancel the job for everyone.
+        """
+        stats = self._stats[key[0]]
+        task = self._inflight.get(key)
+        if task is not None:
+            stats['joined'] += 1
+            return task
+        until = self._cooling.get(key)
+        if until is not None:
+            if time.monotonic() < until:
+                stats['suppressed'] += 1
+                return None
+            del self._cooling[key]
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        stats['runs'] += 1
+        task.add_done_callback(lambda _: self._finish(key, self.cooldown if cooldown is None else cooldown))
+        return task
+
+    def _finish(self, key, cooldown):
+        self._inflight.pop(key, None)
+        now = time.monotonic()
+        self._cooling[key] = now + cooldown
+        self._cooling.move_to_end(key)
+        # Expired entries are oldest-first; drop them, then enforce the size bound
+        while self._cooling:
+            oldest_key, until = next(iter(self._cooling.items()))
+            if until > now and len(self._cooling) <= self.max_keys:
+                break
+            del self._cooling[oldest_key]
+
+    def in_flight(self, bot_path=None):
+        return [key for key in self._inflight if bot_path is None or key[0] == bot_path]
+
+    def cancel(self, bot_path=None):
+        """Cancel in-flight jobs for ``bot_path`` (every job when None)."""
+        for key, task in list(self._inflight.items()):
+            if bot_path is None or key[0] == bot_path:
+                task.cancel()
+
+    def reset(self, bot_path):
+        """Forget cooldowns for ``bot_path`` (e.g. after it was restarted by hand)."""
+        for key in [k for k in self._cooling if k[0] == bot_path]:
+            del self._cooling[key]
+
+    def stats(self, bot_path=None):
+        """{bot_path: {'runs', 'joined', 'suppressed'}}, or one bot's counters."""
+        if bot_path is not None:
+            return dict(self._stats.get(bot_path, {'runs': 0, 'joined': 0, 'suppressed': 0}))
+        return {path: dict(counts) for path, counts in self._stats.items()}
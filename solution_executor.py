@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SolutionTimeout(Exception):
+    """A solution's apply() ran past its time limit and was cancelled."""
+
+class _Worker:
+    """A thread running its own event loop, so a misbehaving solution can't stall the gateway."""
+
+    def __init__(self, name):
+        self.loop = asyncio.new_event_loop()
+        self.busy = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+class SolutionExecutor:
+    """Runs solution ``apply`` coroutines off the main event loop with time limits.
+
+    Each call is scheduled on the least busy of ``workers`` loop threads; at most
+    ``max_concurrent`` run at once (further calls wait their turn). A call is cancelled
+    after the module's ``timeout`` attribute or ``timeout`` seconds and raises
+    SolutionTimeout. Solutions that must touch the gateway client (``bot``) directly can
+    set ``inline = True`` to run on the caller's loop, still under the time limit.
+    """
+
+    def __init__(self, workers=4, max_concurrent=4, timeout=60):
+        self.timeout = timeout
+        self._workers = [_Worker(f"solution-{i}") for i in range(workers)]
+        self._slots = None
+        self._max_concurrent = max_concurrent
+        self._ids = itertools.count(1)
+        self._running = {}        # {job id: (bot_path, solution, future)}
+        self._stats = {'started': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0}
+
+    async def run(self, solution, module, bot, error_details, bot_path=None):
+        """Apply ``module`` and return its ``(success, message)``."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrent)
+        timeout = getattr(module, 'timeout', None) or self.timeout
+        async with self._slots:
+            coro = module.apply(bot, error_details, bot_path)
+            if getattr(module, 'inline', False):
+                future = asyncio.ensure_future(coro)
+                worker = None
+            else:
+                worker = min(self._workers, key=lambda w: w.busy)
+                worker.busy += 1
+                future = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, worker.loop))
+            job = next(self._ids)
+            self._running[job] = (bot_path, solution, future)
+            self._stats['started'] += 1
+            try:
+                result = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._stats['timed_out'] += 1
+                logger.warning(f"⏱️ Solution {solution} for {bot_path} cancelled after {timeout}s")
+                raise SolutionTimeout(f"{solution} exceeded its {timeout}s limit") from None
+            except asyncio.CancelledError:
+                self._stats['cancelled'] += 1
+                future.cancel()
+                raise
+            except Exception:
+                self._stats['failed'] += 1
+                raise
+            finally:
+                self._running.pop(job, None)
+                if worker:
+                    worker.busy -= 1
+            self._stats['succeeded' if result and result[0] else 'failed'] += 1
+            return result
+
+    def cancel(self, bot_path=None):
+        """Cancel running solutions for ``bot_path`` (every one when None); returns how many."""
+        cancelled = 0
+        for path, _, future in list(self._running.values()):
+            if bot_path is None or path == bot_path:
+                cancelled += future.cancel()
+        return cancelled
+
+    def running(self):
+        return [(path, solution) for path, solution, _ in self._running.values()]
+
+    def stats(self):
+        return {**self._stats, 'running': len(self._running)}
+
+    def shutdown(self):
+        self.cancel()
+        for worker in self._workers:
+            worker.stop()
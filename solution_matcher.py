@@ -0,0 +1,174 @@
+import re
+import logging
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse       # Python 3.11+
+except ImportError:                            # pragma: no cover - older interpreters
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+# Numbered and named backreferences and group conditionals; they would point at the wrong
+# group once the pattern is wrapped into the combined regex
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+def required_literals(pattern):
+    """Lower-cased strings of which at least one occurs in every match of ``pattern``.
+
+    Returns None when no such set can be derived (e.g. the pattern starts with a class
+    or wildcard everywhere), meaning the pattern has to be tried on every line.
+    """
+    try:
+        return _sequence_literals(list(sre_parse.parse(pattern)))
+    except (re.error, TypeError, ValueError):
+        return None
+
+def _sequence_literals(items):
+    options = []            # each entry: list of alternatives, one of which is required
+    run = []
+
+    def close_run():
+        if run:
+            options.append([''.join(run).lower()])
+            run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        close_run()
+        inner = None
+        if op is sre_parse.BRANCH:
+            branches = [_sequence_literals(list(branch)) for branch in av[1]]
+            if all(branches):
+                inner = [lit for branch in branches for lit in branch]
+        elif op is sre_parse.SUBPATTERN:
+            inner = _sequence_literals(list(av[-1]))
+        elif op in _REPEATS and av[0] >= 1:
+            inner = _sequence_literals(list(av[2]))
+        if inner:
+            options.append(inner)
+    close_run()
+    if not options:
+        return None
+    # The most selective requirement is the one whose shortest alternative is longest
+    return max(options, key=lambda alts: min(len(a) for a in alts))
+
+class SolutionMatcher:
+    """Single-pass matcher over every solution pattern.
+
+    A literal prefilter discards most lines without running any solution regex: the
+    lower-cased line is scanned once by an alternation of every literal the patterns
+    require, and only on a hit are the individual literals checked to find candidate
+    solutions. Candidates are confirmed by one combined regex of named groups, ordered
+    by priority, so the highest-priority matching solution wins regardless of where it
+    matches in the line. Patterns with backreferences can't be merged and are tried on
+    their own at their place in that order.
+
+    ``entries`` is an iterable of ``(name, pattern, priority)``; patterns may be strings
+    or compiled regexes and are matched case-insensitively. Ties on priority go to the
+    pattern with the longer required literal (the more specific one), then to the
+    higher ``scores[name]`` (e.g. a measured success rate), then to name – so a broad
+    pattern that always reports success can't shadow a specific one.
+    """
+
+    def __init__(self, entries, scores=None):
+        scores = scores or {}
+        self._patterns = {}
+        ranked = []
+        for name, pattern, priority in entries:
+            source = pattern.pattern if isinstance(pattern, re.Pattern) else pattern
+            self._patterns[name] = re.compile(source, re.IGNORECASE)
+            literals = required_literals(source)
+            specificity = min(len(lit) for lit in literals) if literals else 0
+            ranked.append((-(priority or 0), -specificity, -scores.get(name, 0), name, source, literals))
+        ranked.sort()
+        self.order = [name for *_, name, _, _ in ranked]
+        self._sources = {name: source for *_, name, source, _ in ranked}
+
+        # name -> group name used in the combined regex
+        self._groups = {name: f"s{i}" for i, name in enumerate(self.order)}
+        self._names = {group: name for name, group in self._groups.items()}
+
+        # literal -> solutions it proves possible; patterns without literals are always tried
+        self._always = frozenset(name for *_, name, _, literals in ranked if not literals)
+        by_literal = {}
+        for *_, name, _, literals in ranked:
+            for literal in literals or ():
+                by_literal.setdefault(literal, set()).add(name)
+        self._by_literal = [(literal, frozenset(names)) for literal, names in by_literal.items()]
+        if by_literal:
+            # Case-sensitive search over the lower-cased line: far cheaper than IGNORECASE
+            self._prefilter = re.compile('|'.join(re.escape(lit) for lit in sorted(by_literal, key=len, reverse=True)))
+        else:
+            self._prefilter = None
+        self._combined = lru_cache(maxsize=64)(self._compile_combined)
+
+    def __len__(self):
+        return len(self.order)
+
+    def _candidates(self, text):
+        if self._prefilter is None:
+            return self._always
+        lowered = text.lower()
+        if not self._prefilter.search(lowered):
+            return self._always
+        found = set(self._always)
+        for literal, names in self._by_literal:
+            if literal in lowered:
+                found.update(names)
+        return frozenset(found)
+
+    def _compile_combined(self, candidates):
+        """Candidates in priority order as segments: combined regexes, or names to confirm alone."""
+        segments, run = [], []
+
+        def close_run():
+            if not run:
+                return
+            alternation = '|'.join(
+                f"(?=[\\s\\S]*?(?P<{self._groups[name]}>{self._sources[name]}))" for name in run
+            )
+            try:
+                segments.append(re.compile(f"(?:{alternation})", re.IGNORECASE))
+            except re.error:
+                # Clashing group names or misplaced inline flags; confirm these one by one instead
+                segments.extend(run)
+            run.clear()
+
+        for name in self.order:
+            if name not in candidates:
+                continue
+            if _GROUP_REFERENCE.search(self._sources[name]):
+                close_run()
+                segments.append(name)
+            else:
+                run.append(name)
+        close_run()
+        return segments
+
+    def match(self, text):
+        """Return ``(solution_name, match)`` for the highest-priority hit, or ``(None, None)``."""
+        candidates = self._candidates(text)
+        if not candidates:
+            return None, None
+        for segment in self._combined(candidates):
+            if isinstance(segment, str):
+                found = self._patterns[segment].search(text)
+                if found:
+                    return segment, found
+                continue
+            hit = segment.match(text)
+            if hit:
+                name = self._names[hit.lastgroup]
+                return name, self._patterns[name].search(text)
+        return None, None
+
+    def arguments(self, name, text):
+        """Capture groups of solution ``name``'s pattern in ``text`` (e.g. the missing module), or ``()``."""
+        pattern = self._patterns.get(name)
+        found = pattern.search(text) if pattern else None
+        return found.groups() if found else ()
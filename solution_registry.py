@@ -0,0 +1,199 @@
+import os
+import re
+import ast
+import sys
+import json
+import hashlib
+import logging
+import threading
+import importlib.util
+
+from solution_matcher import SolutionMatcher
+from path_watcher import DirectoryWatcher
+
+logger = logging.getLogger(__name__)
+
+# Metadata a solution may declare, as a module-level constant or a "key: value" docstring line
+_FIELDS = {'pattern': str, 'priority': int, 'timeout': float, 'inline': lambda v: str(v).lower() in ('1', 'true', 'yes')}
+_DOC_LINE = re.compile(r"^\s*(pattern|priority|timeout|inline)\s*:\s*(.+?)\s*$", re.MULTILINE)
+
+def parse_solution(file, source):
+    """Metadata of one solution file, read with ``ast`` – the module is never executed.
+
+    Module-level constants win over docstring lines; without either the file name
+    becomes a keyword pattern (``rate_limit.py`` -> ``rate limit``).
+    """
+    meta = {}
+    tree = ast.parse(source, filename=file)
+    doc = ast.get_docstring(tree) or ''
+    for key, value in _DOC_LINE.findall(doc):
+        meta[key] = value
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            key = node.targets[0].id
+            if key in _FIELDS:
+                try:
+                    meta[key] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass      # computed at import time (e.g. re.compile(...)); the docstring may still say
+    meta = {key: _FIELDS[key](value) for key, value in meta.items()}
+    if 'pattern' not in meta:
+        meta['pattern'] = file[:-3].replace('_', ' ')
+    meta.setdefault('priority', 0)
+    meta['description'] = doc.split('\n', 1)[0].strip()
+    meta['has_apply'] = any(isinstance(n, (ast.AsyncFunctionDef, ast.FunctionDef)) and n.name == 'apply'
+                            for n in tree.body)
+    re.compile(meta['pattern'])      # reject a broken pattern here rather than at match time
+    return meta
+
+class SolutionRegistry:
+    """Index of the solution files in ``directory``, kept current while the master runs.
+
+    Patterns and metadata come from parse_solution() and are cached in ``cache_file``
+    keyed by each file's SHA-256, so unchanged files are neither parsed nor imported at
+    startup. A module is imported the first time module() asks for it. ``matcher`` is
+    rebuilt on every change; start() watches the directory so edits, new files and
+    deletions apply without restarting. Solutions of equal priority and specificity are
+    ordered by the scores last passed to reorder().
+    """
+
+    def __init__(self, directory, cache_file=None, debounce=1.0, poll_interval=10):
+        self.directory = directory
+        self.cache_file = cache_file
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.entries = {}         # {file: {'sha256', 'pattern', 'priority', ...}}
+        self.matcher = SolutionMatcher(())
+        self.scores = {}
+        self._listeners = []      # called with (entries, scores) whenever the matcher is rebuilt
+        self._modules = {}        # {file: (sha256, module)}
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stats = {'parsed': 0, 'cached': 0, 'imported': 0, 'reloads': 0, 'errors': 0}
+
+    # ----- Index -----
+    def _load_cache(self):
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        tmp_path = self.cache_file + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write solution index cache: {e}")
+
+    def _index_file(self, file, cached):
+        path = os.path.join(self.directory, file)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        entry = cached.get(file)
+        if entry and entry.get('sha256') == digest:
+            self._stats['cached'] += 1
+            return entry
+        entry = {'sha256': digest, **parse_solution(file, data.decode('utf-8'))}
+        self._stats['parsed'] += 1
+        logger.info(f"Indexed solution {file} with pattern: {entry['pattern']}")
+        return entry
+
+    def _files(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(".py") and not f.startswith("__"))
+
+    def load(self, changed=None):
+        """(Re)index the directory; ``changed`` limits re-reading to those paths (None = everything)."""
+        with self._lock:
+            cached = self.entries if changed is not None else self._load_cache()
+            names = None if changed is None else {os.path.basename(p) for p in changed}
+            entries = {}
+            for file in self._files():
+                if names is not None and file not in names and file in self.entries:
+                    entries[file] = self.entries[file]
+                    continue
+                try:
+                    entries[file] = self._index_file(file, cached)
+                except (OSError, SyntaxError, UnicodeDecodeError, ValueError, re.error) as e:
+                    self._stats['errors'] += 1
+                    logger.error(f"Skipping solution {file}: {e}")
+            for file in set(self._modules) - set(entries):
+                self._modules.pop(file, None)
+            self.entries = entries
+            self._build_matcher()
+            self._stats['reloads'] += 1
+            self._save_cache()
+        return len(entries)
+
+    def _build_matcher(self):
+        entries = [(file, e['pattern'], e['priority']) for file, e in self.entries.items()]
+        self.matcher = SolutionMatcher(entries, self.scores)
+        for listener in self._listeners:
+            listener(entries, self.scores)
+
+    def subscribe(self, listener):
+        """Call ``listener(entries, scores)`` now and after every rebuild (e.g. to sync other matchers)."""
+        with self._lock:
+            self._listeners.append(listener)
+            listener([(file, e['pattern'], e['priority']) for file, e in self.entries.items()], self.scores)
+
+    def reorder(self, scores):
+        """Re-rank solutions by ``scores``; returns True if the match order changed."""
+        with self._lock:
+            if scores == self.scores:
+                return False
+            previous = self.matcher.order
+            self.scores = dict(scores)
+            self._build_matcher()
+            return self.matcher.order != previous
+
+    # ----- Modules -----
+    def module(self, file):
+        """Imported module for ``file``, imported now if it wasn't (or changed since)."""
+        with self._lock:
+            entry = self.entries[file]
+            loaded = self._modules.get(file)
+            if loaded and loaded[0] == entry['sha256']:
+                return loaded[1]
+            module_name = f"solutions.{file[:-3]}"
+            spec = importlib.util.spec_from_file_location(module_name, os.path.join(self.directory, file))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            # Docstring-only metadata becomes visible to the executor like a module constant
+            for key in ('timeout', 'inline'):
+                if key in entry and not hasattr(module, key):
+                    setattr(module, key, entry[key])
+            sys.modules[module_name] = module
+            self._modules[file] = (entry['sha256'], module)
+            self._stats['imported'] += 1
+            logger.info(f"Loaded solution module: {file}")
+            return module
+
+    # ----- Watching -----
+    def _on_change(self, changed):
+        try:
+            count = self.load(changed)
+            logger.info(f"🔄 Solutions reloaded ({count} indexed)")
+        except OSError as e:
+            logger.error(f"Failed to reload solutions: {e}")
+
+    def start(self):
+        if self._watcher is None:
+            self._watcher = DirectoryWatcher(self.directory, '*.py', self._on_change, depth=0,
+                                             debounce=self.debounce, poll_interval=self.poll_interval)
+            self._watcher.start()
+
+    def stop(self):
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+
+    def stats(self):
+        return {**self._stats, 'solutions': len(self.entries), 'loaded': len(self._modules)}
@@ -0,0 +1,67 @@
+import threading
+
+class SolutionStats:
+    """Live hit counts, success rates and latencies per solution.
+
+    seed() restores run/success totals from ``solution_logs`` so rankings survive a
+    restart; latencies are only measured live. scores() gives each solution a
+    Laplace-smoothed success rate rounded to ``resolution`` so the match order only
+    changes when the rate moves meaningfully.
+    """
+
+    def __init__(self, resolution=0.1):
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {'hits': 0, 'runs': 0, 'successes': 0,
+                                         'match_ns': 0, 'apply_seconds': 0.0, 'timed_runs': 0}
+        return entry
+
+    def seed(self, rows):
+        """``rows`` of (solution_file, runs, successes) from the persisted log."""
+        with self._lock:
+            for name, runs, successes in rows:
+                entry = self._entry(name)
+                entry['runs'] += runs or 0
+                entry['successes'] += successes or 0
+
+    def record_match(self, name, elapsed_ns):
+        with self._lock:
+            entry = self._entry(name)
+            entry['hits'] += 1
+            entry['match_ns'] += elapsed_ns
+
+    def record_result(self, name, success, elapsed_seconds=None):
+        with self._lock:
+            entry = self._entry(name)
+            entry['runs'] += 1
+            entry['successes'] += bool(success)
+            if elapsed_seconds is not None:
+                entry['apply_seconds'] += elapsed_seconds
+                entry['timed_runs'] += 1
+
+    def _score(self, entry):
+        return (entry['successes'] + 1) / (entry['runs'] + 2)
+
+    def scores(self):
+        with self._lock:
+            return {name: round(self._score(e) / self.resolution) * self.resolution
+                    for name, e in self._stats.items()}
+
+    def snapshot(self):
+        """One dict per solution, most hit first."""
+        with self._lock:
+            rows = [{
+                'solution': name,
+                'hits': e['hits'],
+                'runs': e['runs'],
+                'success_rate': e['successes'] / e['runs'] if e['runs'] else None,
+                'score': self._score(e),
+                'avg_match_us': e['match_ns'] / e['hits'] / 1000 if e['hits'] else None,
+                'avg_apply_s': e['apply_seconds'] / e['timed_runs'] if e['timed_runs'] else None,
+            } for name, e in self._stats.items()]
+        return sorted(rows, key=lambda r: (-r['hits'], -r['runs'], r['solution']))
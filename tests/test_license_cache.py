@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from license_cache import LicenseIndex
+
+class Table:
+    """bot_licenses as seen through a pyodbc connection; rows carry a row_version."""
+
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+
+    def insert(self, code):
+        self.rows.append(SimpleNamespace(license_code=code, bot_name=code, is_active=True, last_verified=None,
+                                         owner_id=None, bot_path=None, row_version=len(self.rows) + 1))
+
+    def connect(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        self.queries += 1
+        since = params[0] if params else 0
+        self._result = [row for row in self.rows if row.row_version > since]
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+def test_code_issued_elsewhere_is_found_after_a_miss_refresh():
+    table = Table()
+    table.insert('BOT-OLD')
+    index = LicenseIndex(table.connect, refresh_interval=3600, miss_refresh_interval=0.0)
+    index.load()
+    table.insert('BOT-NEW')          # committed by another process
+    assert not index.may_exist('BOT-NEW')
+    assert index.refresh_for_miss()
+    assert index.may_exist('BOT-NEW')
+    index.stop()
+
+def test_miss_refreshes_are_rate_limited():
+    table = Table()
+    table.insert('BOT-OLD')
+    index = LicenseIndex(table.connect, refresh_interval=3600, miss_refresh_interval=60.0)
+    index.load()
+    queries = table.queries
+    # The load just ran, so a flood of made-up codes doesn't reach the database
+    for _ in range(100):
+        assert not index.refresh_for_miss()
+    assert table.queries == queries
+    index.stop()
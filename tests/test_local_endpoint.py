@@ -0,0 +1,38 @@
+import os
+import socket
+import asyncio
+
+import pytest
+
+from local_endpoint import LocalEndpoint
+
+def test_refuses_a_socket_another_instance_is_serving(tmp_path):
+    path = str(tmp_path / "verify.sock")
+
+    async def main():
+        first = LocalEndpoint(path, None, None)
+        await first.start()
+        try:
+            with pytest.raises(OSError):
+                await LocalEndpoint(path, None, None).start()
+            # The first instance still owns a working socket
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.close()
+        finally:
+            await first.stop()
+
+    asyncio.run(main())
+
+def test_replaces_a_stale_socket(tmp_path):
+    path = str(tmp_path / "verify.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    async def main():
+        endpoint = LocalEndpoint(path, None, None, mode=0o600)
+        await endpoint.start()
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        await endpoint.stop()
+
+    asyncio.run(main())
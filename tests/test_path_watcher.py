@@ -0,0 +1,32 @@
+import os
+import time
+import threading
+
+from path_watcher import DirectoryWatcher
+
+def test_unrelated_writes_do_not_starve_the_debounced_callback(tmp_path):
+    bot = tmp_path / "bot"
+    bot.mkdir()
+    fired = threading.Event()
+    changes = []
+
+    def on_change(changed):
+        changes.append(changed)
+        fired.set()
+
+    watcher = DirectoryWatcher(str(tmp_path), "config.py", on_change, depth=1, debounce=0.3, poll_interval=0.1)
+    watcher.start()
+    try:
+        time.sleep(0.2)            # let the watches be installed
+        (bot / "config.py").write_text("BOT_TOKEN = 'x'\n")
+        started = time.monotonic()
+        # A bot writing its log continuously in the same folder
+        while not fired.is_set() and time.monotonic() - started < 3:
+            (bot / "bot.log").write_text(str(time.monotonic()))
+            time.sleep(0.01)
+        elapsed = time.monotonic() - started
+    finally:
+        watcher.stop()
+    assert fired.is_set()
+    assert elapsed < 0.3 + 0.5
+    assert changes[0] is None or os.path.join(str(bot), "config.py") in changes[0]
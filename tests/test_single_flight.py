@@ -0,0 +1,49 @@
+import asyncio
+
+from fingerprint import fingerprint
+from single_flight import SingleFlight
+from solution_matcher import SolutionMatcher
+from traceback_assembler import ErrorEvent
+
+MATCHER = SolutionMatcher([
+    ('module_not_found.py', r"ModuleNotFoundError: No module named '([^']+)'", 0),
+    ('rate_limit.py', r"rate limit", 0),
+])
+
+def key(bot_path, line):
+    # The key ErrorMonitor.process_error runs a matched solution under
+    event = ErrorEvent([line])
+    solution, _ = MATCHER.match(event.match_text)
+    return (bot_path, solution, MATCHER.arguments(solution, event.match_text) or fingerprint(event.match_text))
+
+def run_all(lines):
+    flight = SingleFlight(cooldown=60)
+    runs = []
+
+    async def fix(line):
+        runs.append(line)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        for line in lines:
+            flight.run(key('bot', line), lambda line=line: fix(line))
+            await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+    return runs
+
+def test_records_differing_only_in_timestamp_run_the_solution_once():
+    runs = run_all([
+        "2026-10-17 12:00:01,120 WARNING discord.http: We are being rate limited. Retrying in 1.20 seconds.",
+        "2026-10-17 12:00:09,874 WARNING discord.http: We are being rate limited. Retrying in 3.05 seconds.",
+    ])
+    assert len(runs) == 1
+
+def test_different_captured_modules_each_run():
+    runs = run_all([
+        "ModuleNotFoundError: No module named 'requests'",
+        "ModuleNotFoundError: No module named 'aiohttp'",
+        "ModuleNotFoundError: No module named 'requests'",
+    ])
+    assert runs == ["ModuleNotFoundError: No module named 'requests'",
+                    "ModuleNotFoundError: No module named 'aiohttp'"]
@@ -0,0 +1,23 @@
+from solution_matcher import SolutionMatcher
+
+def test_numbered_backreference_pattern_is_not_merged():
+    matcher = SolutionMatcher([
+        ('key_error.py', r"KeyError: '(\w+)'", 2),
+        ('duplicate_key.py', r"key '(\w+)' defined twice.*'\1'", 1),
+    ])
+    # Both are candidates here; merged into the combined regex, \1 would refer to
+    # key_error.py's wrapper group instead of the duplicated key
+    line = "KeyError: 42 – key 'token' defined twice, first at 'token'"
+    assert matcher.match(line)[0] == 'duplicate_key.py'
+    assert matcher.match("KeyError: 42 – key 'token' defined twice, first at 'prefix'")[0] is None
+    assert matcher.match("KeyError: 'token'")[0] == 'key_error.py'
+
+def test_backreference_pattern_keeps_its_place_in_the_order():
+    matcher = SolutionMatcher([
+        ('timeout.py', r"timed out after (\d+)s", 9),
+        ('repeated.py', r"error (\w+) \1", 5),
+        ('generic.py', r"error", 0),
+    ])
+    assert matcher.match("error again again, timed out after a while")[0] == 'repeated.py'
+    assert matcher.match("error once, timed out after a while")[0] == 'generic.py'
+    assert matcher.match("error again again, timed out after 5s")[0] == 'timeout.py'
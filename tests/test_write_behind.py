@@ -0,0 +1,57 @@
+import time
+
+from write_behind import WriteBehindSink
+
+class FailingConnection:
+    """Stands in for a pyodbc connection to a database that is down."""
+
+    attempts = 0
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, rows):
+        FailingConnection.attempts += 1
+        raise ConnectionError("database unavailable")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_failing_flushes_back_off_with_a_full_buffer(tmp_path):
+    FailingConnection.attempts = 0
+    sink = WriteBehindSink('audit', ('message',), FailingConnection, batch_size=5, flush_interval=0.1,
+                           max_backoff=0.4, journal_dir=str(tmp_path))
+    # Rows keep arriving while the database is down, so the buffer stays over batch_size
+    for i in range(100):
+        sink.put(f"row {i}")
+        time.sleep(0.01)
+    sink.close()
+    # About 0, 0.1, 0.3, 0.7, 1.1 s in; a hot retry loop makes thousands of attempts
+    assert 3 <= FailingConnection.attempts <= 8
+    assert sink.stats()['pending'] == 100
+
+def test_backoff_resets_after_a_successful_flush(tmp_path):
+    written = []
+
+    class FlakyConnection(FailingConnection):
+        def executemany(self, sql, rows):
+            FailingConnection.attempts += 1
+            if FailingConnection.attempts <= 2:
+                raise ConnectionError("database unavailable")
+            written.extend(rows)
+
+        def commit(self):
+            pass
+
+    FailingConnection.attempts = 0
+    sink = WriteBehindSink('audit', ('message',), FlakyConnection, batch_size=1, flush_interval=0.05,
+                           max_backoff=10.0, journal_dir=str(tmp_path))
+    sink.put("first")
+    time.sleep(0.5)
+    sink.put("second")
+    time.sleep(0.2)
+    assert [row[0] for row in written] == ["first", "second"]
+    sink.close()
@@ -0,0 +1,124 @@
+import re
+
+_TRACEBACK = "Traceback (most recent call last):"
+_CHAIN_MARKERS = (
+    "During handling of the above exception, another exception occurred:",
+    "The above exception was the direct cause of the following exception:",
+)
+# discord.py's default handler: "2024-05-01 12:00:01 ERROR    discord.client Ignoring exception in on_message"
+_RECORD = re.compile(r"^\[?\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\]?\s+\[?(DEBUG|INFO|WARNING|ERROR|CRITICAL)\]?\s")
+_FRAME = re.compile(r'^\s*File "([^"]+)", line (\d+)(?:, in (.+))?')
+_EXCEPTION = re.compile(r"^([A-Za-z_][\w.]*)(?::\s?(.*))?$")
+
+class ErrorEvent:
+    """One assembled stderr event: a traceback, a logging record (plus its traceback) or a lone line."""
+
+    __slots__ = ('lines', 'header', 'summary', 'exc_type', 'message', 'frames')
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.header = lines[0] if _RECORD.match(lines[0]) else None
+        self.frames = []
+        summary = None
+        in_traceback = False
+        for line in lines:
+            if line.startswith(_TRACEBACK):
+                in_traceback = True
+                continue
+            frame = _FRAME.match(line)
+            if frame:
+                self.frames.append((frame.group(1), int(frame.group(2)), frame.group(3)))
+            elif in_traceback and line and not line[0].isspace() and line not in _CHAIN_MARKERS:
+                summary = line        # the last one wins, i.e. the outermost chained exception
+        self.summary = (summary or lines[0]).strip()
+        self.exc_type = self.message = None
+        if summary:
+            parsed = _EXCEPTION.match(self.summary)
+            if parsed:
+                self.exc_type, self.message = parsed.group(1), parsed.group(2) or ''
+
+    @property
+    def match_text(self):
+        """What solution patterns are matched against: the record header and the exception line."""
+        if self.header and self.header.strip() != self.summary:
+            return f"{self.header.strip()}\n{self.summary}"
+        return self.summary
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+class TracebackAssembler:
+    """Streaming grouper turning raw stderr lines into ErrorEvents.
+
+    Lines of a ``Traceback (most recent call last):`` block (chained exceptions included)
+    and of a logging record followed by its traceback are collected into one event,
+    which is emitted when the next unrelated line arrives or when the reader calls
+    flush() after ``idle_timeout`` seconds without output. Events are capped at
+    ``max_lines`` lines; the middle of longer blocks is dropped.
+    """
+
+    def __init__(self, idle_timeout=0.5, max_lines=200):
+        self.idle_timeout = idle_timeout
+        self.max_lines = max_lines
+        self._lines = []
+        self._state = None        # None, 'record', 'traceback' or 'summary'
+        self._truncated = 0
+
+    @property
+    def pending(self):
+        return bool(self._lines)
+
+    def feed(self, line):
+        """Add one line (trailing newline removed, indentation kept); returns completed events."""
+        events = []
+        if self._state == 'record':
+            if line.startswith(_TRACEBACK):
+                self._append(line)
+                self._state = 'traceback'
+                return events
+            events.extend(self.flush())
+        elif self._state == 'traceback':
+            if not line or line[0].isspace() or line.startswith(_TRACEBACK):
+                self._append(line)
+            else:
+                self._append(line)
+                self._state = 'summary'
+            return events
+        elif self._state == 'summary':
+            if not line.strip():
+                self._append(line)
+                return events
+            if line in _CHAIN_MARKERS or line.startswith(_TRACEBACK):
+                self._append(line)
+                self._state = 'traceback'
+                return events
+            events.extend(self.flush())
+
+        if line.startswith(_TRACEBACK):
+            self._state = 'traceback'
+            self._append(line)
+        elif _RECORD.match(line):
+            self._state = 'record'
+            self._append(line)
+        elif line.strip():
+            events.append(ErrorEvent([line.strip()]))
+        return events
+
+    def _append(self, line):
+        if len(self._lines) < self.max_lines:
+            self._lines.append(line)
+        else:
+            # Keep the head and, by overwriting the tail, the final exception line
+            self._lines[-1] = line
+            self._truncated += 1
+
+    def flush(self):
+        """Emit whatever block is pending (on idle timeout or end of stream)."""
+        lines, self._lines, self._state = self._lines, [], None
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if self._truncated:
+            lines.insert(-1, f"... {self._truncated} more lines ...")
+            self._truncated = 0
+        return [ErrorEvent(lines)] if lines else []
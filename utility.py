@@ -38,6 +38,11 @@ class Utility(commands.Cog):
             value="Post a patch file to `#bot-patches` for a specific bot.",
             inline=False
         )
+        embed.add_field(
+            name=f"{EMOJIS['log']} `/solutionstats`",
+            value="Show solution hit counts, success rates and match order. (Admin only)",
+            inline=False
+        )
         embed.add_field(
             name=f"{EMOJIS['info']} `/help`",
             value="Show this help message.",
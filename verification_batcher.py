@@ -0,0 +1,70 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class VerificationBatcher:
+    """Coalesces license checks that arrive close together into one lookup.
+
+    The first request opens a batch; it is resolved once no new request arrived for
+    ``window`` seconds, ``max_delay`` seconds after it opened, or when ``max_batch``
+    distinct codes are waiting – whichever comes first. ``verify_many(codes)`` is awaited
+    once per batch and must return the set of valid codes; its exception (e.g. a
+    timeout) is raised to every waiter of that batch.
+    """
+
+    def __init__(self, verify_many, window=0.005, max_delay=0.025, max_batch=500):
+        self.verify_many = verify_many
+        self.window = window
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._waiters = {}        # {license_code: [futures]} of the open batch
+        self._opened = None
+        self._timer = None
+        self._tasks = set()       # running lookups; held so they can't be garbage-collected mid-flight
+        self._stats = {'requests': 0, 'batches': 0, 'largest': 0}
+
+    async def verify(self, license_code):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.setdefault(license_code, []).append(future)
+        self._stats['requests'] += 1
+        now = loop.time()
+        if self._opened is None:
+            self._opened = now
+        if self._timer:
+            self._timer.cancel()
+        if len(self._waiters) >= self.max_batch:
+            self._flush()
+        else:
+            deadline = min(now + self.window, self._opened + self.max_delay)
+            self._timer = loop.call_at(deadline, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+        batch, self._waiters, self._opened, self._timer = self._waiters, {}, None, None
+        if batch:
+            task = asyncio.ensure_future(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch):
+        self._stats['batches'] += 1
+        self._stats['largest'] = max(self._stats['largest'], len(batch))
+        try:
+            valid = await self.verify_many(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for code, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(code in valid)
+
+    def stats(self):
+        return {**self._stats, 'waiting': len(self._waiters), 'resolving': len(self._tasks)}
@@ -0,0 +1,383 @@
+import os
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+class WriteBehindSink:
+    """In-process buffer for one append-only table, flushed with a single executemany.
+
+    Rows are flushed when ``batch_size`` rows are pending or every ``flush_interval``
+    seconds, whichever comes first. Every accepted row is appended to a JSON-lines
+    journal before put() returns, so rows still buffered when the process dies are
+    replayed on the next start. When ``capacity`` rows are pending the ``overflow``
+    policy decides: 'block' waits up to ``block_timeout`` for room and then drops the
+    new row, 'drop_oldest' evicts the oldest pending row, 'drop_newest' rejects the new one.
+
+    A batch failing with one of ``data_errors`` (bad rows rather than a lost connection)
+    is split in halves down to single rows; rows that still fail go to a dead-letter
+    file next to the journal and the rest are committed. Other errors keep the batch
+    for a retry; after each consecutive failure the flusher waits twice as long (from
+    ``flush_interval`` up to ``max_backoff``) before trying again, however full the buffer is.
+    """
+
+    def __init__(self, table, columns, connect, timestamp_column=None, batch_size=500,
+                 flush_interval=2.0, capacity=10000, overflow='block', block_timeout=1.0,
+                 journal_dir=None, fsync=False, data_errors=(), max_backoff=60.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.table = table
+        self.columns = tuple(columns) + ((timestamp_column,) if timestamp_column else ())
+        self.timestamp_column = timestamp_column
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.fsync = fsync
+        self.data_errors = tuple(data_errors)
+        self.max_backoff = max_backoff
+        self._connect = connect
+        self._sql = (f"INSERT INTO {table} ({', '.join(self.columns)}) "
+                     f"VALUES ({', '.join('?' for _ in self.columns)})")
+        self._buffer = deque()
+        self._inflight = None             # batch taken from the buffer but not yet committed
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._stats = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'flushes': 0, 'failures': 0, 'dead_lettered': 0}
+
+        self._journal = None
+        self._journal_path = self._inflight_path = self._dead_path = None
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            self._journal_path = os.path.join(journal_dir, f"{table}.jsonl")
+            self._inflight_path = os.path.join(journal_dir, f"{table}.inflight.jsonl")
+            self._dead_path = os.path.join(journal_dir, f"{table}.dead.jsonl")
+            self._recover()
+
+    # ----- Journal -----
+    def _encode(self, row):
+        record = {}
+        for column, value in zip(self.columns, row):
+            record[column] = value.isoformat() if isinstance(value, datetime) else value
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _decode(self, line):
+        record = json.loads(line)
+        row = [record.get(column) for column in self.columns]
+        if self.timestamp_column and row[-1]:
+            row[-1] = datetime.fromisoformat(row[-1])
+        return tuple(row)
+
+    def _read_journal(self, path):
+        rows = []
+        if not os.path.exists(path):
+            return rows
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rows.append(self._decode(line))
+                except (ValueError, TypeError):
+                    # A torn final line from a crash mid-write – everything before it is intact
+                    logger.warning(f"Skipping unreadable journal line in {path}")
+        return rows
+
+    def _recover(self):
+        rows = self._read_journal(self._inflight_path) + self._read_journal(self._journal_path)
+        tmp_path = self._journal_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(self._encode(row))
+        os.replace(tmp_path, self._journal_path)
+        if os.path.exists(self._inflight_path):
+            os.remove(self._inflight_path)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        if rows:
+            self._buffer.extend(rows)
+            logger.info(f"♻️ Recovered {len(rows)} unflushed {self.table} rows from journal")
+
+    def _rotate_journal(self):
+        """Move the journal aside for the batch being flushed. Caller holds the condition."""
+        if not self._journal:
+            return
+        self._journal.close()
+        os.replace(self._journal_path, self._inflight_path)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+
+    def _rewrite_inflight(self, rows):
+        """Shrink the in-flight journal segment to the rows not yet committed."""
+        if not self._inflight_path:
+            return
+        tmp_path = self._inflight_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(self._encode(row))
+        os.replace(tmp_path, self._inflight_path)
+
+    def _dead_letter(self, row, error):
+        with self._cond:
+            self._stats['dead_lettered'] += 1
+        logger.error(f"❌ Dropped a {self.table} row the database rejects: {error}")
+        if not self._dead_path:
+            return
+        record = json.loads(self._encode(row))
+        record['_error'] = str(error)
+        with open(self._dead_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # ----- Producer side -----
+    def put(self, *values):
+        """Queue one row; returns False if the overflow policy dropped it."""
+        row = values + ((datetime.now(),) if self.timestamp_column else ())
+        with self._cond:
+            if self._stopping:
+                self._stats['dropped'] += 1
+                logger.error(f"❌ {self.table} write-behind sink is closed, dropped a row")
+                return False
+            if self._thread is None:
+                self._start()
+            if self._pending() >= self.capacity:
+                if self.overflow == 'drop_oldest' and self._buffer:
+                    self._buffer.popleft()
+                    self._stats['dropped'] += 1
+                elif self.overflow == 'block':
+                    self._cond.notify_all()
+                    self._cond.wait_for(lambda: self._pending() < self.capacity, self.block_timeout)
+                if self._pending() >= self.capacity:
+                    self._stats['dropped'] += 1
+                    logger.warning(f"⚠️ {self.table} write-behind buffer full, dropped a row")
+                    return False
+            self._buffer.append(row)
+            self._stats['enqueued'] += 1
+            if self._journal:
+                self._journal.write(self._encode(row))
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _pending(self):
+        return len(self._buffer) + (len(self._inflight) if self._inflight else 0)
+
+    # ----- Flusher side -----
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.table}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                if failures:
+                    # A full buffer must not turn a failing database into a retry spin; only close() cuts this short
+                    delay = min(self.flush_interval * 2 ** min(failures - 1, 16), self.max_backoff)
+                    self._cond.wait_for(lambda: self._stopping, delay)
+                elif not self._stopping and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+                failed_before = self._stats['failures']
+            self.flush()
+            with self._cond:
+                failures = failures + 1 if self._stats['failures'] != failed_before else 0
+
+    def flush(self):
+        """Write everything pending in one transaction; returns the number of rows committed."""
+        with self._flush_lock:
+            if self._inflight is None:
+                with self._cond:
+                    if not self._buffer:
+                        return 0
+                    self._inflight = list(self._buffer)
+                    self._buffer.clear()
+                    self._rotate_journal()
+            batch = self._inflight
+            try:
+                try:
+                    self._write(batch)
+                    written = len(batch)
+                except self.data_errors as e:
+                    logger.warning(f"⚠️ {self.table} batch of {len(batch)} rows rejected ({e}), isolating bad rows")
+                    written = self._write_isolated(batch)
+            except Exception as e:
+                # Keep the uncommitted rows (and their journal segment) and retry on the next tick
+                with self._cond:
+                    self._stats['failures'] += 1
+                logger.error(f"Failed to flush {len(self._inflight)} rows into {self.table}: {e}")
+                return 0
+            with self._cond:
+                self._inflight = None
+                self._stats['flushed'] += written
+                self._stats['flushes'] += 1
+                if self._inflight_path and os.path.exists(self._inflight_path):
+                    os.remove(self._inflight_path)
+                self._cond.notify_all()
+            return written
+
+    def _write_isolated(self, batch):
+        """Write ``batch`` in ever smaller chunks, dead-lettering single rows that still fail.
+
+        On any other error the rows not yet committed become the new in-flight batch
+        and the error propagates.
+        """
+        chunks = deque([batch[:len(batch) // 2], batch[len(batch) // 2:]])
+        written = 0
+        while chunks:
+            chunk = chunks.popleft()
+            if not chunk:
+                continue
+            try:
+                self._write(chunk)
+                written += len(chunk)
+            except self.data_errors as e:
+                if len(chunk) == 1:
+                    self._dead_letter(chunk[0], e)
+                else:
+                    chunks.appendleft(chunk[len(chunk) // 2:])
+                    chunks.appendleft(chunk[:len(chunk) // 2])
+            except Exception:
+                remaining = chunk + [row for rest in chunks for row in rest]
+                with self._cond:
+                    self._inflight = remaining
+                    self._stats['flushed'] += written
+                self._rewrite_inflight(remaining)
+                raise
+        return written
+
+    def _write(self, rows):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(self._sql, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def close(self):
+        """Stop the flusher and write out whatever is pending (the journal keeps any remainder)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+        while self.flush():
+            pass
+        with self._cond:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending()
+        return stats
+
+class CoalescedUpdate:
+    """Latest-value-wins buffer for one hot column, flushed as a single set-based UPDATE.
+
+    record() only touches a dict; the flusher thread writes every pending key at most
+    ``max_staleness`` seconds later by loading them into a temp table and joining it
+    against ``table`` in one statement.
+    """
+
+    def __init__(self, table, key_column, value_column, connect, key_type='NVARCHAR(50)',
+                 value_type='DATETIME', max_staleness=30.0):
+        self.table = table
+        self.max_staleness = max_staleness
+        self._connect = connect
+        temp = f"#pending_{value_column}"
+        self._statements = (
+            f"IF OBJECT_ID('tempdb..{temp}') IS NOT NULL DROP TABLE {temp}",
+            f"CREATE TABLE {temp} (k {key_type} PRIMARY KEY, v {value_type})",
+        )
+        self._insert = f"INSERT INTO {temp} (k, v) VALUES (?, ?)"
+        self._update = (f"UPDATE t SET t.{value_column} = p.v FROM {table} t "
+                        f"JOIN {temp} p ON t.{key_column} = p.k")
+        self._drop = f"DROP TABLE {temp}"
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'recorded': 0, 'coalesced': 0, 'flushed': 0, 'flushes': 0, 'failures': 0}
+
+    def record(self, key, value):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"coalesce-{self.table}", daemon=True)
+                self._thread.start()
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+            self._pending[key] = value
+            self._stats['recorded'] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.max_staleness):
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                self._write(list(batch.items()))
+            except Exception as e:
+                with self._lock:
+                    self._stats['failures'] += 1
+                    # Put the batch back without clobbering values recorded meanwhile
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+                logger.error(f"Failed to flush {len(batch)} {self.table} updates: {e}")
+                return 0
+            with self._lock:
+                self._stats['flushed'] += len(batch)
+                self._stats['flushes'] += 1
+            return len(batch)
+
+    def _write(self, rows):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            for statement in self._statements:
+                cursor.execute(statement)
+            cursor.fast_executemany = True
+            cursor.executemany(self._insert, rows)
+            cursor.execute(self._update)
+            cursor.execute(self._drop)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats